@@ -1,5 +1,5 @@
 from dotenv import load_dotenv
-import MetaTrader5 as mt5
+import MetaTrader5
 import pandas as pd
 import numpy as np
 import json
@@ -7,6 +7,26 @@ import schedule
 import time
 import os
 from datetime import datetime
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from Lib.utils.mt5_guard import MT5Guard
+from Lib.utils.bar_aggregator import BarAggregator
+from Lib.utils.regime_board import open_board
+from Lib.utils.bar_memo import BarMemo
+from Lib.utils.log_setup import setup_logging
+from choppy_scan import DEFAULT_WINDOWS, regime_map, scan, stack_ohlc
+from choppy_thresholds import SEED_BARS, AdaptiveThresholds
+
+# Configure logging (written by a background listener, rotated and gzipped)
+setup_logging(os.path.join("../../Lib/logs", "choppy_market.log"), console=True)
+
+mt5 = MT5Guard(MetaTrader5)
+# M5 bars are built locally from an incrementally fetched M1 stream
+bar_aggregator = BarAggregator(mt5)
+# final.py reads the choppy state from shared memory; the JSON is an audit trail
+regime_board = open_board()
+bar_memo = BarMemo(mt5)
 
 # Load environment variables
 load_dotenv()
@@ -59,47 +79,14 @@ def is_choppy_market(df, point, window=10, atr_threshold=200, doji_threshold=3,
             }
         }
     
-    recent = df.tail(window).copy()
-    
-    # Calculate price differences
-    recent['body_price'] = abs(recent['close'] - recent['open'])
-    recent['prev_close'] = recent['close'].shift(1)
-    recent['tr_price'] = np.maximum(
-        recent['high'] - recent['low'],
-        np.maximum(
-            abs(recent['high'] - recent['prev_close']),
-            abs(recent['low'] - recent['prev_close'])
-        )
-    )
-    
-    # Convert to points
-    recent['body_points'] = recent['body_price'] / point
-    recent['tr_points'] = recent['tr_price'] / point
-    recent['candle_range_points'] = (recent['high'] - recent['low']) / point
-    
-    # ATR (simple average over window, i.e., 10 candles for XAUUSD M5)
-    # To change ATR period, modify the window here (e.g., recent['tr_points'].tail(5).mean() for 5-candle ATR)
-    avg_atr_points = recent['tr_points'].mean()
-    
-    # Identify dojis (body < doji_body_points), ensure Python bool
-    recent['is_doji'] = recent['body_points'] < doji_body_points
-    recent['is_doji'] = recent['is_doji'].astype(bool)  # Fix NumPy bool_ issue
-    num_dojis = int(recent['is_doji'].sum())
-    
-    # Overall price range in points
-    max_high = recent['high'].max()
-    min_low = recent['low'].min()
-    price_range_points = (max_high - min_low) / point
-    
-    # Choppy conditions: all must be True
-    # 1. Low volatility: ATR < atr_threshold (e.g., 200 points)
-    # 2. Enough dojis: num_dojis >= doji_threshold (e.g., 3)
-    # 3. Tight range: price_range_points < range_threshold (e.g., 500 points)
-    is_low_vol = avg_atr_points < atr_threshold
-    is_many_dojis = num_dojis >= doji_threshold
-    is_tight_range = price_range_points < range_threshold
-    
-    choppy = is_low_vol and is_many_dojis and is_tight_range
+    # Same metrics as the multi-symbol scanner, for one symbol and one window
+    _, ohlc = stack_ohlc({"symbol": df}, window)
+    metrics = scan(ohlc, [point], windows=(window,), atr_threshold=atr_threshold, doji_threshold=doji_threshold,
+                   range_threshold=range_threshold, doji_body_points=doji_body_points)
+    avg_atr_points = metrics["avg_atr_points"][0, 0]
+    num_dojis = metrics["num_dojis"][0, 0]
+    price_range_points = metrics["price_range_points"][0, 0]
+    choppy = metrics["is_choppy"][0, 0]
     market_condition = "Choppy" if choppy else "Trending/Volatile"
     
     # Prepare results dict
@@ -111,10 +98,10 @@ def is_choppy_market(df, point, window=10, atr_threshold=200, doji_threshold=3,
         "num_dojis": int(num_dojis),  # Ensure int
         "price_range_points": round(float(price_range_points), 2),  # Ensure float
         "thresholds": {
-            "atr": int(atr_threshold),
+            "atr": round(float(atr_threshold), 2),
             "dojis": int(doji_threshold),
-            "range": int(range_threshold),
-            "doji_body": int(doji_body_points)
+            "range": round(float(range_threshold), 2),
+            "doji_body": round(float(doji_body_points), 2)
         }
     }
     
@@ -137,14 +124,61 @@ def save_to_json(results, json_path):
     except Exception as e:
         print(f"Error saving JSON: {e}")
 
-def job(symbol, timeframe, json_path, point):
-    """Job function to run detection and update JSON."""
-    # Fetch last 10 M5 candles
-    num_bars = 10
-    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, num_bars)
-    
-    if rates is None or len(rates) == 0:
-        print("Failed to fetch rates")
+def fetch_rates(symbols, timeframe):
+    """Enough candles per symbol for the longest window; symbols without data are left out."""
+    rates_by_symbol = {}
+    for symbol in symbols:
+        rates = bar_aggregator.rates(symbol, timeframe, max(DEFAULT_WINDOWS))
+        if rates is None or len(rates) == 0:
+            print(f"Failed to fetch rates for {symbol}")
+            continue
+        rates_by_symbol[symbol] = rates
+        print(f"[{datetime.now().isoformat()}] Fetched {len(rates)} M5 candles for {symbol}")
+    return rates_by_symbol
+
+def detect(rates_by_symbol, symbols, timeframe, points, window=10):
+    """Run detection for every symbol in rates_by_symbol."""
+    num_bars = max(DEFAULT_WINDOWS)
+    # Feed newly closed bars into the rolling-percentile thresholds (seeded from history once)
+    for symbol, rates in rates_by_symbol.items():
+        if adaptive_thresholds.needs_seed(symbol):
+            history = mt5.copy_rates_from_pos(symbol, timeframe, 0, SEED_BARS)
+            if not adaptive_thresholds.update(symbol, history, points[symbol]):
+                # Seed again next run rather than starting from the few live bars
+                print(f"Could not seed thresholds for {symbol} from history, retrying next run")
+                continue
+        adaptive_thresholds.update(symbol, rates, points[symbol])
+    adaptive_thresholds.save()
+    thresholds = {symbol: adaptive_thresholds.thresholds(symbol) for symbol in rates_by_symbol}
+    
+    # All symbols and windows in one pass
+    scanned, ohlc = stack_ohlc(rates_by_symbol, num_bars)
+    metrics = scan(ohlc, [points[s] for s in scanned],
+                   atr_threshold=[thresholds[s]["atr"] for s in scanned],
+                   doji_threshold=[thresholds[s]["dojis"] for s in scanned],
+                   range_threshold=[thresholds[s]["range"] for s in scanned],
+                   doji_body_points=[thresholds[s]["doji_body"] for s in scanned])
+    regimes = regime_map(scanned, metrics, primary_window=window)
+    for symbol in scanned:
+        regimes[symbol]["thresholds"] = thresholds[symbol]
+    
+    # Top-level fields keep the single-symbol layout (first symbol) for older readers
+    primary = symbols[0] if symbols[0] in rates_by_symbol else scanned[0]
+    df = pd.DataFrame(rates_by_symbol[primary])[['open', 'high', 'low', 'close']]
+    results = is_choppy_market(df, points[primary], window=window, atr_threshold=thresholds[primary]["atr"],
+                               doji_threshold=thresholds[primary]["dojis"], range_threshold=thresholds[primary]["range"],
+                               doji_body_points=thresholds[primary]["doji_body"])
+    results["symbols"] = regimes
+    return results
+
+def job(symbols, timeframe, json_path, points, window=10):
+    """Job function to run detection for every symbol and update JSON."""
+    # Unchanged latest bars (idle market) reuse the previous detection without a fetch. The probe
+    # reads the M1 bar the aggregator builds M5 from, so it doesn't bypass the M1 stream
+    results = bar_memo.run("choppy", symbols, mt5.TIMEFRAME_M1, lambda: fetch_rates(symbols, timeframe),
+                           lambda rates: detect(rates, symbols, timeframe, points, window))
+    
+    if results is None:
         results = {
             "timestamp": datetime.now().isoformat(),
             "is_choppy": False,
@@ -157,72 +191,78 @@ def job(symbol, timeframe, json_path, point):
                 "dojis": 3,
                 "range": 500,
                 "doji_body": 50
-            }
+            },
+            "symbols": {}
         }
         save_to_json(results, json_path)
+        if regime_board is not None:
+            for symbol in symbols:
+                regime_board.publish_choppy(symbol, results["market_condition"], 0.0)
         return
     
-    # Convert to DataFrame
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    df = df[['time', 'open', 'high', 'low', 'close']]
-    
-    print(f"[{datetime.now().isoformat()}] Fetched {len(df)} M5 candles for {symbol}")
-    
-    # Detect and save
-    results = is_choppy_market(df, point)
+    results["timestamp"] = datetime.now().isoformat()
+    regimes = results["symbols"]
     save_to_json(results, json_path)
+    if regime_board is not None:
+        for symbol, regime in regimes.items():
+            regime_board.publish_choppy(symbol, regime["market_condition"], regime["avg_atr_points"])
     
-    if results['is_choppy']:
-        print("🚨 Choppy market detected! Avoid scalping.")
-    else:
-        print("📈 Market may be trending or volatile. Check for scalp opportunities.")
+    for symbol, regime in regimes.items():
+        if regime['is_choppy']:
+            print(f"🚨 {symbol}: Choppy market detected! Avoid scalping.")
+        else:
+            print(f"📈 {symbol}: Market may be trending or volatile. Check for scalp opportunities.")
 
 if __name__ == "__main__":
     # Initialize MT5 connection
     if not initialize_mt5():
         quit()
     
-    # Symbol and timeframe
-    symbol = "XAUUSD"
+    # Symbols and timeframe
+    symbols = [s.strip() for s in os.getenv('CHOPPY_SYMBOLS', 'XAUUSD').split(',') if s.strip()]
     timeframe = mt5.TIMEFRAME_M5
     
-    # Ensure XAUUSD is selected
-    if not mt5.symbol_select(symbol, True):
-        print(f"Failed to select {symbol}")
+    # Ensure symbols are selected and get their point values
+    points = {}
+    for symbol in symbols:
+        if not mt5.symbol_select(symbol, True):
+            print(f"Failed to select {symbol}")
+            continue
+        symbol_info = mt5.symbol_info(symbol)
+        if symbol_info is None:
+            print(f"Failed to get info for {symbol}")
+            continue
+        points[symbol] = symbol_info.point  # e.g., 0.01 for XAUUSD
+        print(f"Point value for {symbol}: {points[symbol]}")
+    symbols = [s for s in symbols if s in points]
+    if not symbols:
         mt5.shutdown()
         quit()
     
-    # Get point value
-    symbol_info = mt5.symbol_info(symbol)
-    if symbol_info is None:
-        print(f"Failed to get info for {symbol}")
-        mt5.shutdown()
-        quit()
-    point = symbol_info.point  # e.g., 0.01 for XAUUSD
-    print(f"Point value for {symbol}: {point}")
-    
     # JSON path
     json_path = r'..\..\json\choppy_market_detection.json'
     
+    # Thresholds follow each symbol's own volatility; saved across restarts
+    adaptive_thresholds = AdaptiveThresholds(r'..\..\json\choppy_thresholds.json')
+    
     # Schedule job every hour at minutes divisible by 5
-    schedule.every().hour.at("04:54").do(job, symbol, timeframe, json_path, point)
-    schedule.every().hour.at("09:54").do(job, symbol, timeframe, json_path, point)
-    schedule.every().hour.at("14:54").do(job, symbol, timeframe, json_path, point)
-    schedule.every().hour.at("19:54").do(job, symbol, timeframe, json_path, point)
-    schedule.every().hour.at("24:54").do(job, symbol, timeframe, json_path, point)
-    schedule.every().hour.at("29:54").do(job, symbol, timeframe, json_path, point)
-    schedule.every().hour.at("34:54").do(job, symbol, timeframe, json_path, point)
-    schedule.every().hour.at("39:54").do(job, symbol, timeframe, json_path, point)  #35:35
-    schedule.every().hour.at("44:54").do(job, symbol, timeframe, json_path, point)
-    schedule.every().hour.at("49:54").do(job, symbol, timeframe, json_path, point)
-    schedule.every().hour.at("54:54").do(job, symbol, timeframe, json_path, point)
-    schedule.every().hour.at("59:54").do(job, symbol, timeframe, json_path, point)
+    schedule.every().hour.at("04:54").do(job, symbols, timeframe, json_path, points)
+    schedule.every().hour.at("09:54").do(job, symbols, timeframe, json_path, points)
+    schedule.every().hour.at("14:54").do(job, symbols, timeframe, json_path, points)
+    schedule.every().hour.at("19:54").do(job, symbols, timeframe, json_path, points)
+    schedule.every().hour.at("24:54").do(job, symbols, timeframe, json_path, points)
+    schedule.every().hour.at("29:54").do(job, symbols, timeframe, json_path, points)
+    schedule.every().hour.at("34:54").do(job, symbols, timeframe, json_path, points)
+    schedule.every().hour.at("39:54").do(job, symbols, timeframe, json_path, points)  #35:35
+    schedule.every().hour.at("44:54").do(job, symbols, timeframe, json_path, points)
+    schedule.every().hour.at("49:54").do(job, symbols, timeframe, json_path, points)
+    schedule.every().hour.at("54:54").do(job, symbols, timeframe, json_path, points)
+    schedule.every().hour.at("59:54").do(job, symbols, timeframe, json_path, points)
 
 
     
     # Run initial job
-    job(symbol, timeframe, json_path, point)
+    job(symbols, timeframe, json_path, points)
     
     # Run scheduler loop
     print("Scheduler started. Running every hour at minutes 05, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55. Press Ctrl+C to stop.")
@@ -0,0 +1,120 @@
+import numpy as np
+
+OPEN, HIGH, LOW, CLOSE = range(4)
+
+DEFAULT_WINDOWS = (5, 10, 20)
+DEFAULT_THRESHOLDS = {"atr": 200, "dojis": 3, "range": 500, "doji_body": 50}
+
+
+def stack_ohlc(rates_by_symbol, bars):
+    """
+    Stack copy_rates arrays (or DataFrames) into a (symbols x bars x 4) OHLC
+    array, right-aligned on the latest bar. Symbols with fewer bars are
+    NaN-padded at the front.
+    """
+    symbols = list(rates_by_symbol)
+    ohlc = np.full((len(symbols), bars, 4), np.nan)
+    for i, symbol in enumerate(symbols):
+        rates = rates_by_symbol[symbol]
+        if rates is None or len(rates) == 0:
+            continue
+        n = min(bars, len(rates))
+        for j, field in enumerate(("open", "high", "low", "close")):
+            ohlc[i, bars - n:, j] = np.asarray(rates[field], dtype=float)[-n:]
+    return symbols, ohlc
+
+
+def scan(ohlc, points, windows=DEFAULT_WINDOWS, atr_threshold=200, doji_threshold=3,
+         range_threshold=500, doji_body_points=50):
+    """
+    Choppiness metrics for every symbol and window in one pass.
+
+    ohlc is (symbols x bars x 4); points holds each symbol's point size and
+    each threshold is a scalar or one value per symbol. For a
+    window w the metrics match is_choppy_market on the last w bars: the ATR
+    averages true range over bars 2..w (the first bar has no previous close in
+    the window), a doji has a body under doji_body_points, and the range is
+    highest high minus lowest low. All are computed from reverse cumulative
+    sums/extrema, so every window is read off the same arrays.
+
+    Returns a dict of (symbols x windows) arrays: avg_atr_points, num_dojis,
+    price_range_points, is_choppy and valid (False where the symbol has fewer
+    than w bars).
+    """
+    ohlc = np.asarray(ohlc, dtype=float)
+    points = np.asarray(points, dtype=float)[:, None]
+    windows = np.asarray(windows)
+    o, h, l, c = (ohlc[..., k] for k in range(4))
+    atr_threshold, doji_threshold, range_threshold, doji_body_points = (
+        np.asarray(t, dtype=float).reshape(-1, 1) if np.ndim(t) else t
+        for t in (atr_threshold, doji_threshold, range_threshold, doji_body_points)
+    )
+
+    prev_close = np.concatenate([np.full((ohlc.shape[0], 1), np.nan), c[:, :-1]], axis=1)
+    tr = np.fmax(h - l, np.fmax(np.abs(h - prev_close), np.abs(l - prev_close))) / points
+    doji = (np.abs(c - o) / points < doji_body_points).astype(float)
+
+    # Reverse running aggregates: position k covers the last k + 1 bars
+    def tail_cumsum(values):
+        return np.cumsum(values[:, ::-1], axis=1)
+
+    tr_sum = tail_cumsum(np.nan_to_num(tr))
+    tr_count = tail_cumsum(np.isfinite(tr).astype(float))
+    doji_count = tail_cumsum(doji)
+    bar_count = tail_cumsum(np.isfinite(c).astype(float))
+    high_max = np.fmax.accumulate(h[:, ::-1], axis=1)
+    low_min = np.fmin.accumulate(l[:, ::-1], axis=1)
+
+    # TR of the window's first bar is excluded, so the ATR sums the last w - 1 values
+    atr_idx = np.maximum(windows - 2, 0)
+    idx = windows - 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_atr_points = tr_sum[:, atr_idx] / tr_count[:, atr_idx]
+    num_dojis = doji_count[:, idx].astype(int)
+    price_range_points = (high_max[:, idx] - low_min[:, idx]) / points
+    valid = bar_count[:, idx] >= windows
+
+    is_choppy = (valid & (avg_atr_points < atr_threshold) & (num_dojis >= doji_threshold)
+                 & (price_range_points < range_threshold))
+    return {
+        "avg_atr_points": avg_atr_points,
+        "num_dojis": num_dojis,
+        "price_range_points": price_range_points,
+        "is_choppy": is_choppy,
+        "valid": valid,
+    }
+
+
+def regime_map(symbols, metrics, windows=DEFAULT_WINDOWS, primary_window=10):
+    """
+    Per-symbol regime dict for the JSON: each symbol's condition comes from the
+    primary window, with every window's metrics listed under "windows".
+    """
+    windows = list(windows)
+    regimes = {}
+    for i, symbol in enumerate(symbols):
+        per_window = {}
+        for j, window in enumerate(windows):
+            if not metrics["valid"][i, j]:
+                per_window[str(window)] = {"market_condition": "Insufficient Data"}
+                continue
+            per_window[str(window)] = {
+                "is_choppy": bool(metrics["is_choppy"][i, j]),
+                "avg_atr_points": round(float(metrics["avg_atr_points"][i, j]), 2),
+                "num_dojis": int(metrics["num_dojis"][i, j]),
+                "price_range_points": round(float(metrics["price_range_points"][i, j]), 2),
+            }
+        main = per_window[str(primary_window)]
+        if "is_choppy" in main:
+            condition = "Choppy" if main["is_choppy"] else "Trending/Volatile"
+        else:
+            condition = "Insufficient Data"
+        regimes[symbol] = {
+            "is_choppy": main.get("is_choppy", False),
+            "market_condition": condition,
+            "avg_atr_points": main.get("avg_atr_points", 0.0),
+            "num_dojis": main.get("num_dojis", 0),
+            "price_range_points": main.get("price_range_points", 0.0),
+            "windows": per_window,
+        }
+    return regimes
@@ -0,0 +1,113 @@
+import json
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from choppy_scan import DEFAULT_THRESHOLDS, scan
+from Lib.utils.streaming_quantile import RollingQuantile
+
+# Percentile of each metric's history used as the threshold: a window is "quiet"
+# when its ATR and range sit in the lowest quarter, and a doji's body in the lowest fifth
+QUANTILES = {"atr": 0.25, "range": 0.25, "doji_body": 0.2}
+MIN_SAMPLES = 500   # below this the hand-tuned defaults are used
+SEED_BARS = 8640    # ~30 days of M5 bars to warm up a new symbol
+SPAN_BARS = 8640    # thresholds follow the last ~30-60 days of bars
+
+
+class AdaptiveThresholds:
+    """
+    Rolling-percentile choppy thresholds per symbol, persisted to JSON.
+
+    Each closed bar feeds the window ATR and range ending at that bar and the
+    bar's body size into rolling P-square estimators covering the last
+    span_bars to 2 * span_bars bars, so an update is O(1), no bar history is
+    kept and the thresholds follow changes in volatility. Bars at or before the last one seen are ignored, so
+    re-fetching overlapping rates is safe. Until a symbol has MIN_SAMPLES
+    bars, thresholds() returns the fixed defaults.
+    """
+
+    def __init__(self, path, window=10, quantiles=QUANTILES, min_samples=MIN_SAMPLES, defaults=DEFAULT_THRESHOLDS,
+                 span_bars=SPAN_BARS):
+        self.path = path
+        self.window = window
+        self.span_bars = span_bars
+        self.quantiles = quantiles
+        self.min_samples = min_samples
+        self.defaults = defaults
+        self._symbols = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        for symbol, state in data.get("symbols", {}).items():
+            self._symbols[symbol] = {
+                "last_bar_time": state["last_bar_time"],
+                "estimators": {name: RollingQuantile.from_dict(e, self.span_bars)
+                               for name, e in state["estimators"].items()},
+            }
+
+    def save(self):
+        data = {"window": self.window, "symbols": {
+            symbol: {
+                "last_bar_time": state["last_bar_time"],
+                "thresholds": self.thresholds(symbol),
+                "estimators": {name: e.to_dict() for name, e in state["estimators"].items()},
+            } for symbol, state in self._symbols.items()
+        }}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def needs_seed(self, symbol):
+        return symbol not in self._symbols
+
+    def samples(self, symbol):
+        state = self._symbols.get(symbol)
+        return state["estimators"]["atr"].n if state else 0
+
+    def update(self, symbol, rates, point):
+        """Feed the closed bars of rates (the last, forming bar is skipped). Returns bars added."""
+        # No state until a full window arrives, so a failed seed fetch leaves needs_seed() True
+        if rates is None or len(rates) < self.window + 1:
+            return 0
+        state = self._symbols.setdefault(symbol, {
+            "last_bar_time": 0,
+            "estimators": {name: RollingQuantile(p, self.span_bars) for name, p in self.quantiles.items()},
+        })
+        closed = rates[:-1]
+        times = np.asarray(closed["time"], dtype=np.int64)
+        ohlc = np.column_stack([np.asarray(closed[f], dtype=float) for f in ("open", "high", "low", "close")])
+
+        # Windows ending at each new closed bar that has a full window behind it
+        ends = np.flatnonzero(times > state["last_bar_time"])
+        ends = ends[ends >= self.window - 1]
+        if len(ends) == 0:
+            return 0
+        windows = sliding_window_view(ohlc, (self.window, 4))[:, 0][ends - (self.window - 1)]
+        metrics = scan(windows, np.full(len(ends), point), windows=(self.window,))
+
+        estimators = state["estimators"]
+        bodies = np.abs(ohlc[ends, 3] - ohlc[ends, 0]) / point
+        for atr, price_range, body in zip(metrics["avg_atr_points"][:, 0], metrics["price_range_points"][:, 0], bodies):
+            estimators["atr"].update(atr)
+            estimators["range"].update(price_range)
+            estimators["doji_body"].update(body)
+        state["last_bar_time"] = int(times[ends[-1]])
+        return len(ends)
+
+    def thresholds(self, symbol):
+        """Current thresholds in points, with the defaults until enough bars were seen."""
+        state = self._symbols.get(symbol)
+        result = dict(self.defaults)
+        if state is None or self.samples(symbol) < self.min_samples:
+            return result
+        for name, estimator in state["estimators"].items():
+            result[name] = round(float(estimator.value()), 2)
+        return result
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta, time as dtime
-import MetaTrader5 as mt5
+import MetaTrader5
 import pandas_ta as ta
 import pytz
 import pickle
@@ -13,22 +13,38 @@ import os
 import json
 from dotenv import load_dotenv
 import logging
-from pathlib import Path
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from config.trading_ranges import TRADING_RANGES  
+from Lib.utils.mt5_guard import MT5Guard
+from Lib.utils.symbol_cache import SymbolCache
+from Lib.utils.bar_aggregator import BarAggregator
+from Lib.utils.deal_store import DealStore, default_db_path
+from Lib.utils.journal import DecisionJournal
+from Lib.utils.log_setup import setup_logging
+from Lib.utils.regime_board import open_board
+from Lib.utils.trading_calendar import TradingCalendar
+from Lib.utils.halt_latch import HaltLatch
+from Lib.utils.atr_engine import AtrEngine
+from Lib.utils.file_watch import JsonFileWatcher
+
+mt5 = MT5Guard(MetaTrader5)
+symbol_cache = SymbolCache(mt5)
+# M2 bars are built locally from one incrementally fetched M1 stream per symbol
+bar_aggregator = BarAggregator(mt5)
+# M5 ATR(14) per symbol, seeded from history and updated once per closed bar
+atr_engine = AtrEngine(mt5, MetaTrader5.TIMEFRAME_M5)
 
 # Ensure log directory exists
 log_dir = "../Lib/logs"
 os.makedirs(log_dir, exist_ok=True)
 
-# Configure logging
-logging.basicConfig(
-    filename=os.path.join(log_dir, "mt5_Pandemic_MAIN.log"),
-    level=logging.INFO,
-    format="%(asctime)s - %(message)s"
-)
+# Configure logging (written by a background listener, rotated and gzipped)
+setup_logging(os.path.join(log_dir, "mt5_Pandemic_MAIN.log"))
+
+# One JSON record per evaluated bar instead of DataFrame text dumps in the log
+journal = DecisionJournal(os.path.join(log_dir, "journal"))
 
 # Load environment variables
 load_dotenv()
@@ -39,6 +55,18 @@ server = os.getenv('MT5_SERVER')
 password = os.getenv('MT5_PASSWORD')
 path = os.getenv('MT5_PATH')
 
+# The EA's ATR export, parsed once per change in the background (cross-check only)
+ea_atr_file = JsonFileWatcher(os.getenv('FILE_PATH')) if os.getenv('FILE_PATH') else None
+EA_ATR_MAX_AGE = 5 * 60
+
+# Local deal warehouse, synced incrementally from the terminal
+deal_store = DealStore(default_db_path(login), mt5)
+
+# Choppy/ranging state published by the detectors in shared memory; the JSON files are the fallback
+regime_board = open_board()
+CHOPPY_MAX_AGE = 15 * 60   # choppy job runs every 5 minutes
+RANGING_MAX_AGE = 5 * 60   # ranging job runs every minute
+
 print(f"🏊‍♂️  Pandemic Main initiated 🦠🦠🦠...")
 
 # Initialize MT5 connection
@@ -47,6 +75,7 @@ def initialize_mt5():
         print("Initialization failed:", mt5.last_error())
         mt5.shutdown()
         return False
+    symbol_cache.invalidate()  # New session, re-read symbol specs
     print("Connected to FTMO Account:", mt5.account_info().name)
     return True
 
@@ -60,17 +89,13 @@ def calculate_daily_pl(timezone):
     utc_start = start_of_day.astimezone(pytz.utc)
     utc_end = end_of_day.astimezone(pytz.utc)
     
-    # Get closed trades from history
-    history = mt5.history_deals_get(utc_start, utc_end)
-    if history is None or len(history) == 0:
-        return 0.0  # No trades today
-    
-    total_pl = 0.0
-    for deal in history:
-        if deal.type in (mt5.DEAL_TYPE_BUY, mt5.DEAL_TYPE_SELL):
-            total_pl += deal.profit  # Sum profit/loss for each deal
-    
-    return total_pl
+    # Pull only new deals from the terminal, then sum today's closed trades locally
+    if deal_store.sync() is None:
+        print("Deal history sync failed:", mt5.last_error())
+        logging.error(f"Deal history sync failed: {mt5.last_error()}")
+
+    return deal_store.profit_between(utc_start.timestamp(), utc_end.timestamp(),
+                                     (mt5.DEAL_TYPE_BUY, mt5.DEAL_TYPE_SELL))
 
 # Function to save drawdown state to JSON
 def save_drawdown_state(max_pl, date, filename="../json/drawdown_state.json"):
@@ -91,8 +116,9 @@ def load_drawdown_state(filename="../json/drawdown_state.json"):
         return {'max_daily_pl': 0.0, 'last_date': None}
 
 # Function to check daily drawdown limit
-def check_daily_drawdown(timezone, drawdown_limit):
-    current_pl = calculate_daily_pl(timezone)
+def check_daily_drawdown(timezone, drawdown_limit, current_pl=None):
+    if current_pl is None:
+        current_pl = calculate_daily_pl(timezone)
     
     # Load or initialize drawdown state
     state = load_drawdown_state()
@@ -125,78 +151,33 @@ def reset_drawdown_at_midnight():
     save_drawdown_state(0.0, today)
     print(f"Reset drawdown to 0.0 at midnight {today}")
 
-# Modified: Function to check if today is a weekday
-def is_weekday(timezone):
-    today = datetime.now(timezone).weekday()
-    return today < 5  # Monday=0, Tuesday=1, ..., Friday=4
+# Daily loss/drawdown halts, persisted until the next Nairobi midnight
+halt_latch = HaltLatch(timezone=pytz.timezone("Africa/Nairobi"))
 
-# Modified: Function to get trading time ranges for the current day
-def get_day_trading_ranges(day_name):
-    return TRADING_RANGES.get(day_name, [])
+# Weekly ranges and the date schedule compiled once; the schedule file is re-read only when it changes
+trading_calendar = TradingCalendar(TRADING_RANGES, "../json/trading_schedule.json", pytz.timezone("Africa/Nairobi"))
 
 # Modified: Updated function to check if current time is within allowed time ranges
 def is_within_time_ranges(timezone):
-    now = datetime.now(timezone)
-    day_name = now.strftime('%A')
-    
-    # Check if today is a weekday
-    if not is_weekday(timezone):
-        return False, f"🚫 NOT A WEEKDAY: No trading on {day_name}."
-    
-    # Get trading time ranges for the current day
-    trading_time_ranges = get_day_trading_ranges(day_name)
-    if not trading_time_ranges:
-        return False, f"🚫 NO TRADING RANGES DEFINED for {day_name}."
-    
-    current_time = now.time()
-    for start_time, end_time in trading_time_ranges:
-        if start_time <= current_time <= end_time:
-            return True, f"✅ TRADING ALLOWED: {day_name} {current_time.strftime('%H:%M:%S')} within {start_time.strftime('%H:%M')}-{end_time.strftime('%H:%M')}"
-    return False, f"🚫 NOT TRADING TIME: {day_name} {current_time.strftime('%H:%M:%S')} outside defined ranges."
+    return trading_calendar.check_time(datetime.now(timezone))
 
 # New: Function to check if today is a trading day based on trading_schedule.json
-def check_trading_day(timezone, json_path="../json/trading_schedule.json"):
-    today = datetime.now(timezone).date().strftime('%Y-%m-%d')
-    try:
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-        
-        # Validate JSON structure and date range
-        if 'schedule' not in data or 'start_date' not in data or 'end_date' not in data:
-            print(f"Error: Invalid JSON format in {json_path}. Pausing trading.")
-            return False, "Invalid JSON"
-        
-        schedule = data['schedule']
-        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
-        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
-        
-        if today < start_date.strftime('%Y-%m-%d') or today > end_date.strftime('%Y-%m-%d'):
-            print(f"Error: Today ({today}) is outside JSON date range ({start_date} to {end_date}). Pausing trading.")
-            return False, "Outside date range"
-        
-        if today not in schedule:
-            print(f"Error: Today ({today}) not found in schedule. Pausing trading.")
-            return False, "Date not found"
-        
-        status = schedule[today]
-        if status == "Trading Day":
-            return True, f"✅ Today ({today}) is a Trading Day. Trading allowed."
-        else:
-            return False, f"🚫 Today is {status}, no trading."
-    
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error: Could not load {json_path} ({str(e)}). Pausing trading.")
-        return False, "JSON load error"
+def check_trading_day(timezone):
+    return trading_calendar.check_day(datetime.now(timezone))
 
 # Function to load choppy market data from JSON
+# Returns the global condition plus per-symbol conditions; symbols missing from the map use the global one
 def load_choppy_market_data(json_path="../json/choppy_market_detection.json"):
     try:
         with open(json_path, 'r') as f:
             data = json.load(f)
-            return data.get("market_condition", "Choppy")  # Default to Choppy if key missing
+            market_condition = data.get("market_condition", "Choppy")  # Default to Choppy if key missing
+            symbol_conditions = {symbol: regime.get("market_condition", market_condition)
+                                 for symbol, regime in data.get("symbols", {}).items()}
+            return market_condition, symbol_conditions
     except (FileNotFoundError, json.JSONDecodeError):
         print(f"Warning: Could not load {json_path}, assuming choppy market for safety.")
-        return "Choppy"
+        return "Choppy", {}
 
 # Run trading logic
 def run_trading_script():
@@ -206,6 +187,14 @@ def run_trading_script():
     daily_loss_limit = float(os.getenv('DAILY_LOSS_LIMIT_2', '-20.0'))
     drawdown_limit = float(os.getenv('DAILY_DRAWDOWN_LIMIT_2', '-11.0'))
 
+    # A limit already hit today: stop here without re-checking the day or querying history
+    halt = halt_latch.active(login)
+    if halt is not None:
+        message = f"🚫 TRADING HALTED until {halt['until'].strftime('%Y-%m-%d %H:%M')} ({halt['limit']}): {halt['reason']}"
+        print(message)
+        logging.info(message)
+        return
+
     # New: Check if today is a trading day
     is_trading_day, message = check_trading_day(timezone)
     if not is_trading_day:
@@ -226,19 +215,37 @@ def run_trading_script():
         message = f"🚫 DAILY LOSS LIMIT HIT: ${-daily_pl:.2f} exceeds ${-daily_loss_limit:.2f}. Trading paused for today."
         print(message)
         logging.info(message)
+        halt_latch.halt(login, "daily_loss", f"daily P/L ${daily_pl:.2f}")
         return  # Skip trading logic
 
     # Check daily drawdown limit
-    if not check_daily_drawdown(timezone, drawdown_limit):
+    if not check_daily_drawdown(timezone, drawdown_limit, daily_pl):
+        halt_latch.halt(login, "daily_drawdown", f"daily P/L ${daily_pl:.2f}")
         return  # Skip trading logic
 
-    # Check market condition from choppy_market_detection.json
-    market_condition = load_choppy_market_data()
-    if market_condition == "Choppy":
+    # Check market condition per symbol from choppy_market_detection.json
+    desired_symbols = ["XAUUSD"]
+    market_conditions = {}
+    if regime_board is not None:
+        for symbol in desired_symbols:
+            state = regime_board.read_choppy(symbol, max_age=CHOPPY_MAX_AGE)
+            if state is not None:
+                market_conditions[symbol] = state["market_condition"]
+    if len(market_conditions) < len(desired_symbols):
+        market_condition, symbol_conditions = load_choppy_market_data()
+        for symbol in desired_symbols:
+            market_conditions.setdefault(symbol, symbol_conditions.get(symbol, market_condition))
+    choppy_symbols = [symbol for symbol, condition in market_conditions.items() if condition == "Choppy"]
+    desired_symbols = [symbol for symbol in desired_symbols if symbol not in choppy_symbols]
+    if not desired_symbols:
         message = "Update: Market choppy, no trades placed."
         print(message)
         logging.info(message)
-        return  # Skip trading logic if market is choppy
+        return  # Skip trading logic if every symbol is choppy
+    if choppy_symbols:
+        message = f"Update: Market choppy for {choppy_symbols}, skipping them."
+        print(message)
+        logging.info(message)
 
     # Log current P/L status
     message = f"Daily P/L: ${daily_pl:.2f}"
@@ -253,15 +260,10 @@ def run_trading_script():
     print("MetaTrader5 package version: ", mt5.__version__)
 
     # Get symbols
-    symbols = mt5.symbols_get()
-    desired_symbols = ["XAUUSD"]
-
-    count = 0
-    for s in symbols:
-        if s.name in desired_symbols:
-            count += 1
-            if count == len(desired_symbols):
-                break
+    available_symbols = symbol_cache.symbol_names()
+    missing_symbols = [s for s in desired_symbols if s not in available_symbols]
+    if missing_symbols:
+        print(f"Symbols not offered by broker: {missing_symbols}")
 
     timeframe = getattr(mt5, os.getenv('TIMEFRAME_2', 'TIMEFRAME_M2'))
     num_candles = int(os.getenv('NUM_CANDLES', '50'))
@@ -274,7 +276,7 @@ def run_trading_script():
     # Convert the data to a pandas DataFrame
     df_list = []
     for symbol in desired_symbols:
-        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, num_candles)
+        rates = bar_aggregator.rates(symbol, timeframe, num_candles)
         rates_frame = pd.DataFrame(rates)
         rates_frame['symbol'] = symbol
         rates_frame['time'] = pd.to_datetime(rates_frame['time'], unit='s')
@@ -386,15 +388,38 @@ def run_trading_script():
     df.loc[(df['trade-zone'] == 'tradable') & (df['range'] == 0) & (df['EMA_crossover'] == 'bullish'), 'TradeSignal'] = 'Buy'
     df.loc[(df['trade-zone'] == 'tradable') & (df['range'] == 0) & (df['EMA_crossover'] == 'bearish'), 'TradeSignal'] = 'Sell'
 
-    # Log and print DataFrame
-    logging.info(df[df['TradeSignal'].isin(['Buy', 'Sell'])].to_string())
-    print(df[['symbol', 'high', 'low', 'spread', 'open', 'close', 'tick_volume', 'TradeSignal', 'trade-zone', 'range', 'EMA_crossover']].tail())
-
     # Trade execution
     current_time = df.index[-1]
     past_df = df[df.index < current_time]
     current_df = df[df.index >= current_time]
 
+    # Journal record for the evaluated bar; the order outcome is filled in below
+    def bar_decision(bar_time, row):
+        symbol = row['symbol']
+        return {
+            "bar_time": bar_time,
+            "symbol": symbol,
+            "open": row['open'],
+            "high": row['high'],
+            "low": row['low'],
+            "close": row['close'],
+            "spread": row['spread'],
+            "tick_volume": row['tick_volume'],
+            "ema_2": ema_dict[symbol]['ema_2_min'].iloc[-1],
+            "ema_10": ema_dict[symbol]['ema_10_min'].iloc[-1],
+            "ema_crossover": row['EMA_crossover'],
+            "trade_zone": row['trade-zone'],
+            "range": row['range'],
+            "market_condition": market_conditions[symbol],
+            "daily_pl": daily_pl,
+            "signal": row['TradeSignal'],
+            "action": "no signal",
+        }
+
+    for index, row in current_df.iterrows():
+        print(f"{index} {row['symbol']} O:{row['open']} H:{row['high']} L:{row['low']} C:{row['close']} "
+              f"signal={row['TradeSignal']} zone={row['trade-zone']} range={row['range']} ema={row['EMA_crossover']}")
+
     # Load ranging market data from JSON
     def load_ranging_market_data(json_path="../json/ranging_market_fusion_acc.json"):
         try:
@@ -404,139 +429,188 @@ def run_trading_script():
             print(f"Warning: Could not load {json_path}, assuming ranging market for safety.")
             return {"symbols": [{"pair": s, "market_status": "Ranging", "is_marabozu": False, "candle_type": "Neutral"} for s in desired_symbols]}
 
-    ranging_data = load_ranging_market_data()
+    ranging_states = [regime_board.read_ranging(symbol, max_age=RANGING_MAX_AGE) for symbol in desired_symbols] if regime_board is not None else []
+    if ranging_states and all(ranging_states):
+        ranging_data = {"symbols": ranging_states}
+    else:
+        ranging_data = load_ranging_market_data()
 
-    # Load ATR from JSON
-    try:
-        json_text = Path(os.getenv('FILE_PATH')).read_text(encoding='utf-16')
-        atr_data = json.loads(json_text)
-        atr_value = atr_data.get('atr_value', 0.0)  # Default to 0.0 if not found
-        print(f"Loaded ATR value: {atr_value}")
-    except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
-        print(f"Error loading ATR from JSON: {e}, using default ATR of 0.0")
-        atr_value = 0.0
+    # ATR per symbol from the local engine; the EA's ATR file, when configured, is only a cross-check
+    atr_values = {symbol: atr_engine.value(symbol) for symbol in current_df['symbol'].unique()}
+    for symbol, atr in atr_values.items():
+        print(f"ATR {symbol}: {atr}")
+    ea_atr = ea_atr_file.get(max_age=EA_ATR_MAX_AGE) if ea_atr_file is not None else None
+    if ea_atr:
+        atr_engine.cross_check(os.getenv('ATR_CHECK_SYMBOL', 'XAUUSD'), ea_atr.get('atr_value', 0.0))
 
     # Skip trading if ATR is not available (0.0)
-    if atr_value == 0.0:
+    if not any(atr_values.values()):
         print("ATR value is 0.0, skipping all trades due to missing ATR data.")
+        for index, row in current_df.iterrows():
+            journal.record(**bar_decision(index, row), atr=0.0, action="skipped: no ATR")
+        journal.flush()
         return
     
     for index, row in current_df.iterrows():
         symbol = row['symbol']
         trade_signal = row['TradeSignal']
-
-        if pd.isna(trade_signal):
-            print(f"No trade for {symbol}")
-            continue
-    
-        # Modified: Check additional conditions from JSON (is_marabozu and candle_type alignment)
-        market_status = next((s["market_status"] for s in ranging_data["symbols"] if s["pair"] == symbol), "Ranging")
-        is_marabozu = next((s["is_marabozu"] for s in ranging_data["symbols"] if s["pair"] == symbol), False)
-        candle_type = next((s["candle_type"] for s in ranging_data["symbols"] if s["pair"] == symbol), "Neutral")
-        
-        # Check if market is trending and is_marabozu is True
-        if market_status != "Trending" or not is_marabozu:
-            print(f"Skipping trade for {symbol}: Market status is {market_status} or not a Marabozu candle (is_marabozu: {is_marabozu}).")
-            continue
-
-        # Check if trade signal matches candle type
-        if (trade_signal == "Sell" and candle_type != "Bearish") or (trade_signal == "Buy" and candle_type != "Bullish"):
-            print(f"Skipping trade for {symbol}: Trade signal {trade_signal} does not match candle type {candle_type}.")
-            continue
-
-        if trade_signal == 'Sell':
-            print(f"Sell {symbol}")
-            symbol_info = mt5.symbol_info(symbol)
-            if symbol_info is None:
-                print(symbol, "not found, can not call order_check()")
+        decision = bar_decision(index, row)
+        atr_value = atr_values.get(symbol, 0.0)
+        decision["atr"] = atr_value
+        try:
+            if pd.isna(trade_signal):
+                print(f"No trade for {symbol}")
                 continue
-            if not symbol_info.visible:
-                print(symbol, "is not visible, trying to switch on")
-                if not mt5.symbol_select(symbol, True):
-                    print("symbol_select({}) failed, exit".format(symbol))
+
+            if atr_value == 0.0:
+                print(f"Skipping trade for {symbol}: no ATR available.")
+                decision["action"] = "skipped: no ATR"
                 continue
 
-            point = mt5.symbol_info(symbol).point
-            price = mt5.symbol_info_tick(symbol).bid
-            sl = price + (2 * atr_value)  # Stop-loss at 2 ATR above entry price
-
-            deviation = 20
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": symbol,
-                "volume": 0.04,  # Constant lot size
-                "type": mt5.ORDER_TYPE_SELL,
-                "price": price,
-                "sl": sl,
-                "deviation": deviation,
-                "magic": 234000,
-                "comment": "python script open",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_FOK,
-            }
+            # Modified: Check additional conditions from JSON (is_marabozu and candle_type alignment)
+            market_status = next((s["market_status"] for s in ranging_data["symbols"] if s["pair"] == symbol), "Ranging")
+            is_marabozu = next((s["is_marabozu"] for s in ranging_data["symbols"] if s["pair"] == symbol), False)
+            candle_type = next((s["candle_type"] for s in ranging_data["symbols"] if s["pair"] == symbol), "Neutral")
+            decision.update(market_status=market_status, is_marabozu=is_marabozu, candle_type=candle_type)
 
-            result = mt5.order_send(request)
-            if result.retcode != mt5.TRADE_RETCODE_DONE:
-                print("order_send failed, retcode={}".format(result.retcode))
-                result_dict = result._asdict()
-                for field in result_dict.keys():
-                    print("   {}={}".format(field, result_dict[field]))
-                    if field == "request":
-                        traderequest_dict = result_dict[field]._asdict()
-                        for tradereq_filed in traderequest_dict:
-                            print("       traderequest: {}={}".format(tradereq_filed, traderequest_dict[tradereq_filed]))
-                continue
-            print("order_send done, ", result)
-            print("   opened position with POSITION_TICKET={}".format(result.order))
-
-        elif trade_signal == 'Buy':
-            print(f"Buy {symbol}")
-            symbol_info = mt5.symbol_info(symbol)
-            if symbol_info is None:
-                print(symbol, "not found, can not call order_check()")
-                continue
-            if not symbol_info.visible:
-                print(symbol, "is not visible, trying to switch on")
-                if not mt5.symbol_select(symbol, True):
-                    print("symbol_select({}) failed, exit".format(symbol))
+            # Check if market is trending and is_marabozu is True
+            if market_status != "Trending" or not is_marabozu:
+                print(f"Skipping trade for {symbol}: Market status is {market_status} or not a Marabozu candle (is_marabozu: {is_marabozu}).")
+                decision["action"] = "skipped: not trending/marabozu"
                 continue
 
-            point = mt5.symbol_info(symbol).point
-            price = mt5.symbol_info_tick(symbol).ask
-            sl = price - (2 * atr_value)  # Stop-loss at 2 ATR below entry price
-
-            deviation = 20
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": symbol,
-                "volume": 0.04,  # Constant lot size
-                "type": mt5.ORDER_TYPE_BUY,
-                "price": price,
-                "sl": sl,
-                "deviation": deviation,
-                "magic": 234000,
-                "comment": "python script open",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_FOK,
-            }
-
-            result = mt5.order_send(request)
-            if result.retcode != mt5.TRADE_RETCODE_DONE:
-                print("order_send failed, retcode={}".format(result.retcode))
-                result_dict = result._asdict()
-                for field in result_dict.keys():
-                    print("   {}={}".format(field, result_dict[field]))
-                    if field == "request":
-                        traderequest_dict = result_dict[field]._asdict()
-                        for tradereq_filed in traderequest_dict:
-                            print("       traderequest: {}={}".format(tradereq_filed, traderequest_dict[tradereq_filed]))
+            # Check if trade signal matches candle type
+            if (trade_signal == "Sell" and candle_type != "Bearish") or (trade_signal == "Buy" and candle_type != "Bullish"):
+                print(f"Skipping trade for {symbol}: Trade signal {trade_signal} does not match candle type {candle_type}.")
+                decision["action"] = "skipped: candle type mismatch"
                 continue
-            print("order_send done, ", result)
-            print("   opened position with POSITION_TICKET={}".format(result.order))
 
+            if trade_signal == 'Sell':
+                print(f"Sell {symbol}")
+                symbol_info = symbol_cache.symbol_info(symbol)
+                if symbol_info is None:
+                    print(symbol, "not found, can not call order_check()")
+                    decision["action"] = "skipped: symbol not found"
+                    continue
+                if not symbol_info.visible:
+                    print(symbol, "is not visible, trying to switch on")
+                    if not mt5.symbol_select(symbol, True):
+                        print("symbol_select({}) failed, exit".format(symbol))
+                    symbol_cache.invalidate(symbol)
+                    decision["action"] = "skipped: symbol not visible"
+                    continue
+
+                point = symbol_info.point
+                price = symbol_cache.symbol_info_tick(symbol, max_age=0).bid
+                sl = price + (2 * atr_value)  # Stop-loss at 2 ATR above entry price
+
+                deviation = 20
+                request = {
+                    "action": mt5.TRADE_ACTION_DEAL,
+                    "symbol": symbol,
+                    "volume": 0.04,  # Constant lot size
+                    "type": mt5.ORDER_TYPE_SELL,
+                    "price": price,
+                    "sl": sl,
+                    "deviation": deviation,
+                    "magic": 234000,
+                    "comment": "python script open",
+                    "type_time": mt5.ORDER_TIME_GTC,
+                    "type_filling": mt5.ORDER_FILLING_FOK,
+                }
+
+                result = mt5.order_send(request)
+                decision.update(action="order_send", price=price, sl=sl, volume=request["volume"],
+                                retcode=None if result is None else result.retcode,
+                                order=None if result is None else result.order)
+                if result is None:
+                    logging.error(f"order_send failed for {symbol}: {mt5.last_error()}")
+                    continue
+                if result.retcode != mt5.TRADE_RETCODE_DONE:
+                    logging.error(f"order_send rejected for {symbol}: retcode={result.retcode} comment={result.comment}")
+                    # Full result/request dump only when running with LOG_LEVEL=DEBUG
+                    if logging.getLogger().isEnabledFor(logging.DEBUG):
+                        result_dict = result._asdict()
+                        for field in result_dict.keys():
+                            logging.debug("   {}={}".format(field, result_dict[field]))
+                            if field == "request":
+                                traderequest_dict = result_dict[field]._asdict()
+                                for tradereq_filed in traderequest_dict:
+                                    logging.debug("       traderequest: {}={}".format(tradereq_filed, traderequest_dict[tradereq_filed]))
+                    continue
+                print("order_send done, ", result)
+                print("   opened position with POSITION_TICKET={}".format(result.order))
+
+            elif trade_signal == 'Buy':
+                print(f"Buy {symbol}")
+                symbol_info = symbol_cache.symbol_info(symbol)
+                if symbol_info is None:
+                    print(symbol, "not found, can not call order_check()")
+                    decision["action"] = "skipped: symbol not found"
+                    continue
+                if not symbol_info.visible:
+                    print(symbol, "is not visible, trying to switch on")
+                    if not mt5.symbol_select(symbol, True):
+                        print("symbol_select({}) failed, exit".format(symbol))
+                    symbol_cache.invalidate(symbol)
+                    decision["action"] = "skipped: symbol not visible"
+                    continue
+
+                point = symbol_info.point
+                price = symbol_cache.symbol_info_tick(symbol, max_age=0).ask
+                sl = price - (2 * atr_value)  # Stop-loss at 2 ATR below entry price
+
+                deviation = 20
+                request = {
+                    "action": mt5.TRADE_ACTION_DEAL,
+                    "symbol": symbol,
+                    "volume": 0.04,  # Constant lot size
+                    "type": mt5.ORDER_TYPE_BUY,
+                    "price": price,
+                    "sl": sl,
+                    "deviation": deviation,
+                    "magic": 234000,
+                    "comment": "python script open",
+                    "type_time": mt5.ORDER_TIME_GTC,
+                    "type_filling": mt5.ORDER_FILLING_FOK,
+                }
+
+                result = mt5.order_send(request)
+                decision.update(action="order_send", price=price, sl=sl, volume=request["volume"],
+                                retcode=None if result is None else result.retcode,
+                                order=None if result is None else result.order)
+                if result is None:
+                    logging.error(f"order_send failed for {symbol}: {mt5.last_error()}")
+                    continue
+                if result.retcode != mt5.TRADE_RETCODE_DONE:
+                    logging.error(f"order_send rejected for {symbol}: retcode={result.retcode} comment={result.comment}")
+                    # Full result/request dump only when running with LOG_LEVEL=DEBUG
+                    if logging.getLogger().isEnabledFor(logging.DEBUG):
+                        result_dict = result._asdict()
+                        for field in result_dict.keys():
+                            logging.debug("   {}={}".format(field, result_dict[field]))
+                            if field == "request":
+                                traderequest_dict = result_dict[field]._asdict()
+                                for tradereq_filed in traderequest_dict:
+                                    logging.debug("       traderequest: {}={}".format(tradereq_filed, traderequest_dict[tradereq_filed]))
+                    continue
+                print("order_send done, ", result)
+                print("   opened position with POSITION_TICKET={}".format(result.order))
+        finally:
+            journal.record(**decision)
+
+    journal.flush()
     print(f"🏊‍♂️ Pandemic Main🦠🦠🦠🦠🦠...")
 
 # Main script
+# Trading runs at second 56 of every fifth minute; tagged so they can be dropped while the market is closed
+def schedule_trading_jobs():
+    schedule.clear('trade')
+    for minute in range(4, 60, 5):
+        schedule.every().hour.at(f"{minute:02d}:56").do(run_trading_script).tag('trade')
+
+CLOSED_RECHECK_SECONDS = 600
+
 if __name__ == "__main__":
     # Initialize MT5 connection
     if not initialize_mt5():
@@ -545,26 +619,28 @@ if __name__ == "__main__":
 
     # Schedule the script to run
     schedule.every().day.at("00:00").do(reset_drawdown_at_midnight)
-    
-    schedule.every().hour.at("04:56").do(run_trading_script)
-    schedule.every().hour.at("09:56").do(run_trading_script)
-    schedule.every().hour.at("14:56").do(run_trading_script)
-    schedule.every().hour.at("19:56").do(run_trading_script)
-    schedule.every().hour.at("24:56").do(run_trading_script)
-    schedule.every().hour.at("29:56").do(run_trading_script)
-    schedule.every().hour.at("34:56").do(run_trading_script)
-    schedule.every().hour.at("39:56").do(run_trading_script)  #35:35
-    schedule.every().hour.at("44:56").do(run_trading_script)
-    schedule.every().hour.at("49:56").do(run_trading_script)
-    schedule.every().hour.at("54:56").do(run_trading_script)
-    schedule.every().hour.at("59:56").do(run_trading_script)
-
+    schedule_trading_jobs()
 
     try:
         while True:
+            next_open = None if trading_calendar.is_open() else trading_calendar.next_open()
+            if next_open is not None:
+                # Closed window: drop the trading jobs and sleep until the next open,
+                # waking only for the untagged jobs (midnight reset) and to re-read the schedule
+                schedule.clear('trade')
+                print(f"Market closed, sleeping until {next_open.strftime('%Y-%m-%d %H:%M')}")
+                while next_open is not None and not trading_calendar.is_open():
+                    remaining = (next_open - datetime.now(next_open.tzinfo)).total_seconds()
+                    idle = schedule.idle_seconds()
+                    time.sleep(max(1, min(remaining, CLOSED_RECHECK_SECONDS, idle if idle is not None else remaining)))
+                    schedule.run_pending()
+                    next_open = trading_calendar.next_open()
+                # Fresh trading jobs, so none of them fire at once for the slept-through slots
+                schedule_trading_jobs()
             schedule.run_pending()
             time.sleep(1)
     finally:
         # Ensure MT5 connection is closed on script exit
+        mt5.log_stats()
         mt5.shutdown()
         print("MT5 connection closed.")
\ No newline at end of file
@@ -18,17 +18,14 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from config.trading_ranges import TRADING_RANGES  
+from Lib.utils.log_setup import setup_logging
 
 # Ensure log directory exists
 log_dir = "../Lib/logs"
 os.makedirs(log_dir, exist_ok=True)
 
-# Configure logging
-logging.basicConfig(
-    filename=os.path.join(log_dir, "mt5_Pandemic_MAIN.log"),
-    level=logging.INFO,
-    format="%(asctime)s - %(message)s"
-)
+# Configure logging (own file: final.py rotates mt5_Pandemic_MAIN.log, which fails while another process holds it open)
+setup_logging(os.path.join(log_dir, "mt5_Pandemic_FIRST.log"))
 
 # Load environment variables
 load_dotenv()
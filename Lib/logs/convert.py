@@ -1,46 +1,23 @@
-import re
-import pandas as pd
+import sys
+from log_stream import parse_incremental, parse_archive_parallel
 
-# Initialize list to store parsed log entries
-log_data = []
+# Usage:
+#   python convert.py                     -> parse lines appended to mt5_Pandemic_XE.log since the last run
+#   python convert.py --archive <logfile> -> parse a large archived log in parallel chunks
+log_file = "mt5_Pandemic_XE.log"
+output_file = "mt5_Pandemic_XE.csv"
 
-# Regular expression to match common log format: "2023-10-01 10:00:00 LEVEL Message"
-log_pattern = r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) (\w+) (.*)"
-
-# Read the log file
 try:
-    with open("mt5_Pandemic_XE.log", "r") as file:
-        for line in file:
-            # Strip whitespace and skip empty lines
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Try to match the log pattern
-            match = re.match(log_pattern, line)
-            if match:
-                timestamp, level, message = match.groups()
-                log_data.append({
-                    "timestamp": timestamp,
-                    "level": level,
-                    "message": message
-                })
-            else:
-                # If line doesn't match, log it as unparsed
-                log_data.append({
-                    "timestamp": None,
-                    "level": None,
-                    "message": line
-                })
+    if len(sys.argv) > 2 and sys.argv[1] == "--archive":
+        archive = sys.argv[2]
+        rows = parse_archive_parallel(archive, archive.rsplit('.', 1)[0] + ".csv", parser="generic")
+        print(f"Successfully converted {archive}: {rows} rows")
+    else:
+        # Only the appended part of the log is parsed; a checkpoint stores the byte offset
+        rows = parse_incremental(log_file, output_file, parser="generic")
+        print(f"Successfully converted {log_file} to {output_file} ({rows} new rows)")
 
-    # Convert to DataFrame
-    df = pd.DataFrame(log_data)
-    
-    # Save to CSV
-    df.to_csv("mt5_Pandemic_XE.csv", index=False)
-    print("Successfully converted mt5_Pandemic_MAIN.log to mt5_Pandemic_MAIN.csv")
-    
 except FileNotFoundError:
-    print("Error: mt5_Pandemic_MAIN.log not found")
+    print(f"Error: {log_file} not found")
 except Exception as e:
-    print(f"Error: {str(e)}")
\ No newline at end of file
+    print(f"Error: {str(e)}")
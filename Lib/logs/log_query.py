@@ -0,0 +1,27 @@
+import glob
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from Lib.utils.log_index import load_index, query_window, reindex_segment
+
+# Usage:
+#   python log_query.py <logfile> "<start>" "<end>"  -> print log lines between two timestamps
+#                                                     e.g. "2025-10-16 11:34" "2025-10-16 11:40"
+#   python log_query.py --reindex <logfile>          -> index rotated segments that have no .idx yet
+if len(sys.argv) == 3 and sys.argv[1] == "--reindex":
+    log_file = sys.argv[2]
+    for segment in glob.glob(glob.escape(log_file) + ".*.gz"):
+        if load_index(segment) is None:
+            reindex_segment(segment)
+            print(f"Indexed {segment}")
+elif len(sys.argv) == 4:
+    log_file, start, end = sys.argv[1:]
+    try:
+        for line in query_window(log_file, start, end):
+            print(line)
+    except BrokenPipeError:
+        pass
+else:
+    print('Usage: python log_query.py <logfile> "<start>" "<end>" | --reindex <logfile>')
+    sys.exit(1)
@@ -0,0 +1,342 @@
+import csv
+import hashlib
+import heapq
+import json
+import os
+import re
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+# "2023-10-01 10:00:00 LEVEL Message" (convert.py)
+GENERIC_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) (\w+) (.*)")
+GENERIC_COLUMNS = ["timestamp", "level", "message"]
+GENERIC_TYPES = ["string", "string", "string"]
+
+# Rows of the signal DataFrame dumps (log_to_csv.py)
+TRADE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\s+(\w+)\s+([\d.]+)\s+([\d.]+)\s+(\d+)\s+([\d.]+)\s+([\d.]+)\s+(\d+)\s+(\S+)\s+([a-z-]+)\s+(\d+)\s+(\S+)")
+TRADE_COLUMNS = ["timestamp", "symbol", "high", "low", "spread", "open", "close",
+                 "tick_volume", "TradeSignal", "trade-zone", "range", "EMA_crossover"]
+TRADE_TYPES = ["string", "string", "float64", "float64", "int64", "float64", "float64",
+               "int64", "string", "string", "int64", "string"]
+
+IDENTITY_BYTES = 256
+HOLD_KEYS = 64   # newest distinct keys held back so a later row for the same key can replace them
+
+
+def parse_generic_line(line):
+    match = GENERIC_PATTERN.match(line)
+    if match:
+        return match.groups()
+    # Lines that don't match are kept as unparsed messages
+    return (None, None, line)
+
+
+def parse_trade_line(line):
+    # Skip metadata lines (e.g., containing "DataFrame Tail" or column headers)
+    if "DataFrame Tail" in line or "symbol" in line:
+        return None
+    match = TRADE_PATTERN.match(line)
+    if not match:
+        return None
+    timestamp, symbol, high, low, spread, open_price, close, tick_volume, trade_signal, trade_zone, range_val, ema_crossover = match.groups()
+    # "NaN" becomes None so it is written as NaN in CSV and null in Parquet
+    return (timestamp, symbol, float(high), float(low), int(spread), float(open_price), float(close),
+            int(tick_volume), None if trade_signal == "NaN" else trade_signal, trade_zone, int(range_val),
+            None if ema_crossover == "NaN" else ema_crossover)
+
+
+# parser name -> (line parser, columns, Arrow type of each column)
+PARSERS = {
+    "generic": (parse_generic_line, GENERIC_COLUMNS, GENERIC_TYPES),
+    "trade": (parse_trade_line, TRADE_COLUMNS, TRADE_TYPES),
+}
+
+
+class BoundedKeySet:
+    """Insertion-ordered set that forgets its oldest keys beyond max_keys."""
+
+    def __init__(self, max_keys, keys=()):
+        self.max_keys = max_keys
+        self._keys = OrderedDict.fromkeys(keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def add(self, key):
+        """Return True if key is new."""
+        if key in self._keys:
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+        return True
+
+    def to_list(self):
+        return list(self._keys)
+
+
+class LastRowBuffer:
+    """
+    De-duplicates rows on a key keeping the last occurrence, and releases them
+    in key order.
+
+    The newest hold_keys distinct keys stay pending, so a bar logged while
+    still forming is replaced by the row logged once it closed (the
+    DataFrame dumps repeat their tail every cycle). Once more keys arrive, the
+    smallest pending key is released and remembered in a bounded set; a row
+    for an already released key is dropped. Pending rows survive between runs
+    through the checkpoint.
+    """
+
+    def __init__(self, hold_keys, max_keys, released=(), pending=()):
+        self.hold_keys = hold_keys
+        self.released = BoundedKeySet(max_keys, released)
+        self._pending = {key: tuple(row) for key, row in pending}
+        self._heap = list(self._pending)
+        heapq.heapify(self._heap)
+
+    def add(self, key, row):
+        """Buffer row; returns the rows released by it, in key order."""
+        if key in self._pending:
+            self._pending[key] = row
+            return []
+        if key in self.released:
+            return []
+        self._pending[key] = row
+        heapq.heappush(self._heap, key)
+        out = []
+        while len(self._heap) > self.hold_keys:
+            out.append(self._release())
+        return out
+
+    def _release(self):
+        key = heapq.heappop(self._heap)
+        self.released.add(key)
+        return self._pending.pop(key)
+
+    def drain(self):
+        """Release every pending row (end of an archive, or forced flush)."""
+        return [self._release() for _ in range(len(self._heap))]
+
+    def pending(self):
+        return [[key, list(row)] for key, row in self._pending.items()]
+
+
+class CsvSink:
+    def __init__(self, path, columns, na_rep="NaN"):
+        self.path = path
+        self.columns = columns
+        self.na_rep = na_rep
+
+    def write(self, rows):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(self.columns)
+            writer.writerows([self.na_rep if v is None else v for v in row] for row in rows)
+
+    def close(self):
+        pass
+
+
+class ParquetSink:
+    """
+    Appends one row group per batch to a new part file in a dataset directory.
+
+    Every part is written with the parser's fixed schema rather than one
+    inferred per batch, so an all-NaN column is not typed null and the
+    parts of successive runs read back as one dataset.
+    """
+
+    def __init__(self, directory, columns, types, part_name):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._pq = pq
+        self.columns = columns
+        self.schema = pa.schema([(column, pa.type_for_alias(type_name)) for column, type_name in zip(columns, types)])
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"part-{part_name}.parquet")
+        self._writer = None
+
+    def write(self, rows):
+        table = self._pa.Table.from_pylist([dict(zip(self.columns, row)) for row in rows], schema=self.schema)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, self.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _file_identity(path, length=IDENTITY_BYTES):
+    """Hash of the first bytes of the file, used to notice rotation/truncation."""
+    with open(path, 'rb') as f:
+        head = f.read(length)
+    return hashlib.sha1(head).hexdigest(), len(head)
+
+
+def _load_checkpoint(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_checkpoint(path, state):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def _iter_complete_lines(f):
+    """Yield (text, end_offset) for complete lines; a trailing partial line is left for next run."""
+    offset = f.tell()
+    for raw in f:
+        if not raw.endswith(b"\n"):
+            break
+        offset += len(raw)
+        yield raw.decode('utf-8', errors='replace').strip(), offset
+
+
+def parse_incremental(log_path, output_path, parser="generic", key_column=None, checkpoint_path=None,
+                      batch_size=5000, max_keys=100_000, fmt="csv", hold_keys=HOLD_KEYS, flush=False):
+    """
+    Parse only the lines appended to log_path since the last run.
+
+    A byte-offset checkpoint (<output>.checkpoint.json) records how far the log
+    was read; if the log shrank or its first bytes changed it was rotated and
+    parsing restarts from 0. With key_column, rows go through a LastRowBuffer:
+    the last row per key wins and rows come out sorted by key, with the newest
+    hold_keys keys carried over to the next run (or written now with
+    flush=True). Rows are flushed to CSV or Parquet every batch_size rows, so
+    memory does not grow with the log.
+
+    Returns the number of rows written.
+    """
+    parse_line, columns, types = PARSERS[parser]
+    key_idx = columns.index(key_column) if key_column else None
+    checkpoint_path = checkpoint_path or output_path.rstrip("/\\") + ".checkpoint.json"
+    state = _load_checkpoint(checkpoint_path)
+
+    size = os.path.getsize(log_path)
+    offset = state.get("offset", 0)
+    if offset > size or _file_identity(log_path, state.get("identity_len", 0))[0] != state.get("identity"):
+        offset = 0
+        state = {}
+    buffer = LastRowBuffer(hold_keys, max_keys, state.get("keys", []), state.get("pending", []))
+
+    identity, identity_len = _file_identity(log_path)
+    part_name = f"{identity[:8]}-{offset}"
+    sink = ParquetSink(output_path, columns, types, part_name) if fmt == "parquet" else CsvSink(output_path, columns)
+    batch, written = [], 0
+    try:
+        with open(log_path, 'rb') as f:
+            f.seek(offset)
+            for line, end_offset in _iter_complete_lines(f):
+                offset = end_offset
+                if not line:
+                    continue
+                row = parse_line(line)
+                if row is None:
+                    continue
+                if key_idx is None:
+                    batch.append(row)
+                else:
+                    batch.extend(buffer.add(row[key_idx], row))
+                if len(batch) >= batch_size:
+                    sink.write(batch)
+                    written += len(batch)
+                    batch = []
+        if flush:
+            batch.extend(buffer.drain())
+        if batch:
+            sink.write(batch)
+            written += len(batch)
+    finally:
+        sink.close()
+
+    _save_checkpoint(checkpoint_path, {"offset": offset, "identity": identity, "identity_len": identity_len,
+                                       "keys": buffer.released.to_list(), "pending": buffer.pending()})
+    return written
+
+
+def _chunk_bounds(path, n_chunks):
+    """Split a file into byte ranges that start and end on line boundaries."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, n_chunks):
+            f.seek(max(bounds[-1], size * i // n_chunks))
+            f.readline()
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _parse_chunk(path, start, end, parser):
+    parse_line = PARSERS[parser][0]
+    rows = []
+    with open(path, 'rb') as f:
+        f.seek(start)
+        for raw in f.read(end - start).splitlines():
+            line = raw.decode('utf-8', errors='replace').strip()
+            if line:
+                row = parse_line(line)
+                if row is not None:
+                    rows.append(row)
+    return rows
+
+
+def parse_archive_parallel(log_path, output_path, parser="generic", key_column=None, workers=None,
+                           chunks_per_worker=4, max_keys=100_000, fmt="csv", hold_keys=HOLD_KEYS):
+    """
+    Parse a large, no-longer-growing log in parallel chunks with a process pool.
+    Chunk results are consumed in file order through the same LastRowBuffer as
+    parse_incremental, drained at the end since the archive won't grow. Only
+    about two chunks per worker are in flight at once, so memory follows the
+    chunk size rather than the archive size.
+    """
+    _, columns, types = PARSERS[parser]
+    key_idx = columns.index(key_column) if key_column else None
+    workers = workers or os.cpu_count() or 1
+    bounds = _chunk_bounds(log_path, workers * chunks_per_worker)
+    buffer = LastRowBuffer(hold_keys, max_keys)
+    sink = ParquetSink(output_path, columns, types, "archive") if fmt == "parquet" else CsvSink(output_path, columns)
+    written = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending, chunks = deque(), iter(bounds)
+            for start, end in chunks:
+                pending.append(pool.submit(_parse_chunk, log_path, start, end, parser))
+                if len(pending) >= 2 * workers:
+                    break
+            while pending:
+                # Drop each chunk's rows once consumed and keep the window topped up
+                chunk_rows = pending.popleft().result()
+                for start, end in chunks:
+                    pending.append(pool.submit(_parse_chunk, log_path, start, end, parser))
+                    break
+                if key_idx is None:
+                    rows = chunk_rows
+                else:
+                    rows = [out for row in chunk_rows for out in buffer.add(row[key_idx], row)]
+                del chunk_rows
+                if rows:
+                    sink.write(rows)
+                    written += len(rows)
+            rows = buffer.drain()
+            if rows:
+                sink.write(rows)
+                written += len(rows)
+    finally:
+        sink.close()
+    return written
@@ -1,79 +1,70 @@
-
-import pandas as pd
-import re
-import numpy as np
 import os
+import sys
+from log_stream import TRADE_COLUMNS, parse_incremental, parse_archive_parallel
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from Lib.utils.journal import load_journal
 
-# Initialize list to store parsed log entries
-log_data = []
+# Usage:
+#   python log_to_csv.py                     -> load the decision journal final.py writes (journal/*.jsonl)
+#   python log_to_csv.py --legacy            -> parse the signal DataFrame dumps of old mt5_Pandemic_MAIN.log files
+#                                               (lines appended since the last run)
+#   python log_to_csv.py --archive <logfile> -> parse a large archived legacy log in parallel chunks
+#   add --parquet to write Parquet instead of CSV
+#   add --flush (legacy) to also write the newest bars that are normally held back for the next run
+# final.py no longer logs DataFrame dumps, so the log parser only finds rows in logs written before the journal.
+log_file = "mt5_Pandemic_MAIN.log"
+journal_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "journal")
 
-# Regular expression to match trading data lines
-# Matches: timestamp, symbol, high, low, spread, open, close, tick_volume, TradeSignal, trade-zone, range, EMA_crossover
-data_pattern = r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\s+(\w+)\s+([\d.]+)\s+([\d.]+)\s+(\d+)\s+([\d.]+)\s+([\d.]+)\s+(\d+)\s+(\S+)\s+([a-z-]+)\s+(\d+)\s+(\S+)"
+# Journal fields under the column names of the old log dump layout
+JOURNAL_COLUMNS = {"bar_time": "timestamp", "signal": "TradeSignal", "trade_zone": "trade-zone",
+                   "ema_crossover": "EMA_crossover"}
 
 # Output directory and file
 output_dir = r"C:\Users\User\Desktop\projects\FreeStyler-VI-Pandemic\Lib\logs\lib"
-output_file = os.path.join(output_dir, "mt5_Pandemic_MAIN_clean.csv")
+use_parquet = "--parquet" in sys.argv
+output_file = os.path.join(output_dir, "mt5_Pandemic_MAIN_clean" + ("" if use_parquet else ".csv"))
+fmt = "parquet" if use_parquet else "csv"
 
 # Create output directory if it doesn't exist
 os.makedirs(output_dir, exist_ok=True)
 
-# Read the log file
+
+def convert_journal(output_file, fmt):
+    """Write the journal in the old clean layout (plus its extra fields); last record per bar and symbol wins."""
+    import pandas as pd
+    df = load_journal(journal_dir)
+    if df.empty:
+        return 0
+    df = df.rename(columns=JOURNAL_COLUMNS)
+    df["timestamp"] = pd.to_datetime(df["timestamp"]).dt.strftime("%Y-%m-%d %H:%M:%S")
+    df = df.drop_duplicates(["timestamp", "symbol"], keep="last").sort_values(["timestamp", "symbol"])
+    df = df[TRADE_COLUMNS + [c for c in df.columns if c not in TRADE_COLUMNS]]
+    if fmt == "parquet":
+        df.to_parquet(output_file + ".parquet", index=False)
+    else:
+        df.to_csv(output_file, index=False, na_rep="NaN")
+    return len(df)
+
+
 try:
-    with open("mt5_Pandemic_MAIN.log", "r") as file:
-        for line in file:
-            # Strip whitespace and skip empty lines
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Skip metadata lines (e.g., containing "DataFrame Tail" or column headers)
-            if "DataFrame Tail" in line or "symbol" in line:
-                continue
-                
-            # Check if the line matches the data pattern
-            match = re.match(data_pattern, line)
-            if match:
-                # Extract fields
-                timestamp, symbol, high, low, spread, open_price, close, tick_volume, trade_signal, trade_zone, range_val, ema_crossover = match.groups()
-                
-                # Convert fields to appropriate types, preserving NaN
-                log_data.append({
-                    "timestamp": timestamp,
-                    "symbol": symbol,
-                    "high": float(high),
-                    "low": float(low),
-                    "spread": int(spread),
-                    "open": float(open_price),
-                    "close": float(close),
-                    "tick_volume": int(tick_volume),
-                    "TradeSignal": np.nan if trade_signal == "NaN" else trade_signal,
-                    "trade-zone": trade_zone,
-                    "range": int(range_val),
-                    "EMA_crossover": np.nan if ema_crossover == "NaN" else ema_crossover
-                })
-            else:
-                print(f"Skipped line: {line}")
+    if "--legacy" not in sys.argv and "--archive" not in sys.argv:
+        rows = convert_journal(output_file, fmt)
+        if rows:
+            print(f"Successfully converted {journal_dir} to {output_file} ({rows} rows)")
+        else:
+            print(f"No journal records in {journal_dir}; for logs written before the journal use --legacy")
+    # Rows are de-duplicated on timestamp as they stream in (last occurrence is kept, sorted by timestamp)
+    elif "--archive" in sys.argv:
+        archive = sys.argv[sys.argv.index("--archive") + 1]
+        rows = parse_archive_parallel(archive, output_file, parser="trade", key_column="timestamp", fmt=fmt)
+        print(f"Successfully converted {archive} to {output_file} ({rows} rows)")
+    else:
+        rows = parse_incremental(log_file, output_file, parser="trade", key_column="timestamp", fmt=fmt,
+                                 flush="--flush" in sys.argv)
+        print(f"Successfully converted {log_file} to {output_file} ({rows} new rows)")
 
-    # Create DataFrame
-    df = pd.DataFrame(log_data)
-    
-    # Remove duplicates based on timestamp, keeping the last entry
-    df = df.drop_duplicates(subset=["timestamp"], keep="last")
-    
-    # Define column order
-    columns = ["timestamp", "symbol", "high", "low", "spread", "open", "close", 
-               "tick_volume", "TradeSignal", "trade-zone", "range", "EMA_crossover"]
-    df = df[columns]
-    
-    # Sort by timestamp for consistency
-    df = df.sort_values(by="timestamp")
-    
-    # Save to CSV, ensuring NaN is printed as "NaN"
-    df.to_csv(output_file, index=False, na_rep="NaN")
-    print(f"Successfully converted mt5_Pandemic_MAIN.log to {output_file}")
-    
 except FileNotFoundError:
-    print("Error: mt5_Pandemic_MAIN.log not found")
+    print(f"Error: {log_file} not found")
 except Exception as e:
     print(f"Error: {str(e)}")
@@ -0,0 +1,119 @@
+import json
+import os
+
+import pandas as pd
+import xlsxwriter
+from xlsxwriter.utility import xl_col_to_name
+
+# Column width and whether the column is stored as text
+COLUMN_SPECS = {
+    "Row": (10, False),
+    "Trade ID": (15, False),
+    "Open Time": (20, True),
+    "Close Time": (20, True),
+    "Symbol": (12, False),
+    "Lot": (12, False),
+    "Profit": (12, False),
+    "Bot Name": (12, False),
+    "Trade Time Interval": (12, True),
+    "Day": (12, True),
+    "Trade Type": (12, True),
+    "Entry Price": (12, False),
+    "Trade Range": (15, True),
+    "Outcome": (12, True),
+    "Trade Duration (min)": (15, False),
+    "Duration Range": (15, True),
+}
+
+# Period key lengths on the 'YYYY-MM-DD HH:MM:SS' close time
+PERIOD_KEY_LENGTH = {"D": 10, "M": 7}
+
+MANIFEST_FILE = "manifest.json"
+
+
+def write_workbook(df, path):
+    """
+    Stream one report to disk with xlsxwriter's constant_memory mode.
+
+    Rows are written top to bottom exactly once, so memory stays flat however
+    many trades the sheet holds. The 'Row' column counts visible rows under an
+    autofilter and the Profit column gets a filtered SUBTOTAL below the data.
+    """
+    columns = ["Row"] + [c for c in df.columns if c != "Row"]
+    n_rows = len(df)
+    tmp_path = path + ".tmp"
+
+    workbook = xlsxwriter.Workbook(tmp_path, {"constant_memory": True, "nan_inf_to_errors": True})
+    worksheet = workbook.add_worksheet("Sheet1")
+    text_format = workbook.add_format({"num_format": "@"})
+    header_format = workbook.add_format({"bold": True, "border": 1})
+
+    for idx, name in enumerate(columns):
+        width, is_text = COLUMN_SPECS.get(name, (12, False))
+        worksheet.set_column(idx, idx, width, text_format if is_text else None)
+    worksheet.write_row(0, 0, columns, header_format)
+
+    # Build the visible-row counter column in one go, then stream rows
+    excel_rows = range(2, n_rows + 2)
+    row_formulas = [f'=IF(SUBTOTAL(3,B{r}),AGGREGATE(3,5,$B$2:$B{r}),"")' for r in excel_rows]
+    data = df[columns[1:]].itertuples(index=False, name=None)
+    for offset, (formula, values) in enumerate(zip(row_formulas, data), start=1):
+        worksheet.write_row(offset, 0, (formula,) + values)
+
+    worksheet.autofilter(0, 0, n_rows, len(columns) - 1)
+
+    if "Profit" in columns:
+        profit_idx = columns.index("Profit")
+        profit_col = xl_col_to_name(profit_idx)
+        total_row = n_rows + 1
+        worksheet.write(total_row, profit_idx - 1, "Filtered Total Profit")
+        worksheet.write_formula(total_row, profit_idx, f"=SUBTOTAL(9,{profit_col}2:{profit_col}{n_rows + 1})")
+
+    workbook.close()
+    os.replace(tmp_path, path)
+
+
+def _fingerprint(part):
+    return f"{len(part)}:{int(pd.util.hash_pandas_object(part, index=False).sum()) & 0xFFFFFFFFFFFFFFFF:x}"
+
+
+def _load_manifest(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_period_reports(df, out_dir, period="D", prefix="trade_history", time_column="Close Time"):
+    """
+    Split trades into per-day ('D') or per-month ('M') workbooks named
+    <prefix>_<period>.xlsx and rewrite only the periods whose trades changed
+    since the last run (tracked in Excel/manifest.json under "<prefix>:<period>").
+    Callers writing different column sets to one folder need distinct prefixes.
+
+    Returns the list of workbook paths that were (re)written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    manifest = _load_manifest(manifest_path)
+    period_manifest = manifest.setdefault(f"{prefix}:{period}", {})
+
+    df = df.drop(columns=["Row"], errors="ignore")
+    keys = df[time_column].str.slice(0, PERIOD_KEY_LENGTH[period])
+    written = []
+    for key, part in df.groupby(keys, sort=True):
+        out_path = os.path.join(out_dir, f"{prefix}_{key}.xlsx")
+        fingerprint = _fingerprint(part)
+        if period_manifest.get(key) == fingerprint and os.path.exists(out_path):
+            continue
+        write_workbook(part, out_path)
+        period_manifest[key] = fingerprint
+        written.append(out_path)
+
+    if written:
+        tmp_manifest = manifest_path + ".tmp"
+        with open(tmp_manifest, 'w') as f:
+            json.dump(manifest, f, indent=4, sort_keys=True)
+        os.replace(tmp_manifest, manifest_path)
+    return written
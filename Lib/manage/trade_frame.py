@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# Deal times are shifted into Nairobi time and then back 3 hours, as the reports always did
+REPORT_TIMEZONE = "Africa/Nairobi"
+REPORT_SHIFT_HOURS = 3
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _two_digit(values):
+    return values.astype(str).str.zfill(2)
+
+
+def duration_ranges(duration_minutes):
+    """Vectorized 5-minute duration buckets, e.g. 7.5 -> '5-10 min'."""
+    lower = (np.floor(duration_minutes / 5) * 5).astype('int64')
+    labels = lower.astype(str) + '-' + (lower + 5).astype(str) + ' min'
+    return labels.where(duration_minutes >= 0, "Negative Duration")
+
+
+def reconstruct_trades(deals_df, entry_in, entry_out, deal_type_buy, timezone=REPORT_TIMEZONE, shift_hours=REPORT_SHIFT_HOURS):
+    """
+    Pair entry and exit deals by position_id in one vectorized pass.
+
+    Parameters:
+    - deals_df: DataFrame with TradeDeal columns (e.g. DealStore.to_frame())
+    - entry_in / entry_out / deal_type_buy: mt5.DEAL_ENTRY_IN, mt5.DEAL_ENTRY_OUT, mt5.DEAL_TYPE_BUY
+
+    Returns one row per completed position, in order of first deal. Positions
+    closed in several DEAL_ENTRY_OUT legs get the summed profit and the time
+    of the last leg.
+    """
+    columns = ["Position ID", "Trade ID", "Open Time", "Close Time", "Symbol", "Lot", "Profit",
+               "Trade Time Interval", "Day", "Trade Type", "Entry Price", "Outcome",
+               "Trade Duration (min)", "Duration Range", "Exit Legs"]
+    if deals_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    deals = deals_df.sort_values(['time', 'ticket'], kind='stable')
+    local_time = (pd.to_datetime(deals['time'], unit='s', utc=True)
+                  .dt.tz_convert(timezone).dt.tz_localize(None) - pd.Timedelta(hours=shift_hours))
+    deals = deals.assign(local_time=local_time)
+
+    by_position = deals.groupby('position_id', sort=False)
+    first = by_position[['order', 'symbol', 'volume']].first()
+
+    entries = (deals[deals['entry'] == entry_in]
+               .groupby('position_id', sort=False)
+               .agg(open_time=('local_time', 'last'), deal_type=('type', 'last'), entry_price=('price', 'last')))
+    exits = (deals[deals['entry'] == entry_out]
+             .groupby('position_id', sort=False)
+             .agg(close_time=('local_time', 'last'), profit=('profit', 'sum'), exit_legs=('ticket', 'size')))
+
+    # Only completed trades: an entry and at least one exit
+    trades = first.join(entries, how='inner').join(exits, how='inner')
+
+    open_time = trades['open_time']
+    hour = open_time.dt.hour
+    interval_start = hour - (hour % 2)
+    duration = (trades['close_time'] - open_time).dt.total_seconds() / 60.0
+
+    result = pd.DataFrame({
+        "Position ID": trades.index,
+        "Trade ID": trades['order'].values,
+        "Open Time": open_time.dt.strftime(TIME_FORMAT).values,
+        "Close Time": trades['close_time'].dt.strftime(TIME_FORMAT).values,
+        "Symbol": trades['symbol'].values,
+        "Lot": trades['volume'].round(5).values,
+        "Profit": trades['profit'].values,
+        "Trade Time Interval": (_two_digit(interval_start) + '-' + _two_digit(interval_start + 2)).values,
+        "Day": open_time.dt.day_name().values,
+        "Trade Type": np.where(trades['deal_type'] == deal_type_buy, 'Buy', 'Sell'),
+        "Entry Price": trades['entry_price'].values,
+        "Outcome": np.select([trades['profit'] > 0, trades['profit'] < 0], ["Profit", "Loss"], "Break Even"),
+        "Trade Duration (min)": duration.values,
+        "Duration Range": duration_ranges(duration).values,
+        "Exit Legs": trades['exit_legs'].values,
+    })
+    return result[columns]
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+LOOKBACK = 4       # previous candles checked against the current midpoint
+MIN_OVERLAPS = 2   # ranging when at least this many of them contain it
+
+
+def analyze(rates_by_symbol, lookback=LOOKBACK, min_overlaps=MIN_OVERLAPS):
+    """
+    Ranging/candle state of the latest bar for every symbol, straight from
+    copy_rates_from_pos structured arrays (no DataFrame).
+
+    For each symbol: the latest candle's midpoint (rounded to 5 decimals),
+    range = 1 when at least min_overlaps of the previous lookback candles span
+    that midpoint else 0 (None with fewer than lookback + 1 candles),
+    is_marabozu when the body is more than half the high-low range, and the
+    candle type (Bullish/Bearish/Neutral).
+    """
+    symbols = [s for s, rates in rates_by_symbol.items() if rates is not None and len(rates) > 0]
+    if not symbols:
+        return {}
+    n = lookback + 1
+    # (symbols x n) arrays, right-aligned on the latest bar; missing bars are NaN
+    fields = {f: np.full((len(symbols), n), np.nan) for f in ("open", "high", "low", "close")}
+    times = np.zeros(len(symbols), dtype=np.int64)
+    counts = np.zeros(len(symbols), dtype=int)
+    for i, symbol in enumerate(symbols):
+        rates = rates_by_symbol[symbol][-n:]
+        counts[i] = len(rates)
+        times[i] = rates["time"][-1]
+        for f, values in fields.items():
+            values[i, n - len(rates):] = rates[f]
+
+    o, h, l, c = (fields[f][:, -1] for f in ("open", "high", "low", "close"))
+    midpoint = np.round((h + l) / 2, 5)
+    prev_high, prev_low = fields["high"][:, :-1], fields["low"][:, :-1]
+    overlaps = ((prev_low <= midpoint[:, None]) & (midpoint[:, None] <= prev_high)).sum(axis=1)
+    is_range = overlaps >= min_overlaps
+    is_marabozu = np.abs(c - o) > (h - l) / 2
+    candle_type = np.where(o < c, "Bullish", np.where(o > c, "Bearish", "Neutral"))
+
+    results = {}
+    for i, symbol in enumerate(symbols):
+        results[symbol] = {
+            "midpoint": float(midpoint[i]),
+            "range": int(is_range[i]) if counts[i] >= n else None,
+            "is_marabozu": bool(is_marabozu[i]),
+            "candle_type": str(candle_type[i]),
+            "candle_time": datetime.fromtimestamp(int(times[i]), tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "bar_time": int(times[i]),
+        }
+    return results
+
+
+def fetch_rates(mt5_api, symbols, timeframe, num_candles):
+    """Latest num_candles bars per symbol (forming bar included); symbols without data are left out."""
+    rates_by_symbol = {}
+    for symbol in symbols:
+        rates = mt5_api.copy_rates_from_pos(symbol, timeframe, 0, num_candles)
+        if rates is None or len(rates) == 0:
+            print(f"No data retrieved for {symbol}")
+            continue
+        rates_by_symbol[symbol] = rates
+    return rates_by_symbol
+
+
+def fetch_and_analyze(mt5_api, symbols, timeframe, num_candles, memo=None):
+    """
+    Fetch the latest candles and run analyze(); None when nothing could be
+    fetched. With a BarMemo, unchanged latest bars reuse the previous result
+    without the fetch.
+    """
+    if memo is not None:
+        return memo.run("ranging", symbols, timeframe,
+                        lambda: fetch_rates(mt5_api, symbols, timeframe, num_candles), analyze)
+    rates_by_symbol = fetch_rates(mt5_api, symbols, timeframe, num_candles)
+    return analyze(rates_by_symbol) if rates_by_symbol else None
+
+
+def symbol_entry(symbol, result, with_candle=True):
+    """JSON record for one symbol in the ranging_market*.json layout."""
+    range_status = "Ranging" if result["range"] == 1 else "Trending"
+    entry = {
+        "pair": symbol,
+        "market_status": range_status,
+        "midpoint": result["midpoint"],
+        "is_trending": range_status == "Trending",
+        "candle_time": result["candle_time"],
+    }
+    if with_candle:
+        entry["is_marabozu"] = result["is_marabozu"]
+        entry["candle_type"] = result["candle_type"]
+    return entry
+
+
+def to_frame(results):
+    """pandas view of analyze() output, for display only."""
+    import pandas as pd
+    return pd.DataFrame.from_dict(results, orient="index")
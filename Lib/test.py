@@ -1,25 +1,39 @@
 import json
-from pathlib import Path
+import time
 from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Lib.utils.file_watch import JsonFileWatcher
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Get the file path from the environment variable
-file_path = Path(os.getenv('FILE_PATH'))
+file_path = os.getenv('FILE_PATH')
 
-try:
-    json_text = file_path.read_text(encoding='utf-16')  # Read as UTF-16 encoded text
-    data = json.loads(json_text)
+# Parsed once per change; partial writes keep the last good value
+watcher = JsonFileWatcher(file_path)
+data = watcher.get()
+if data is None:
+    print("Could not read JSON from MT5 file:", watcher.error)
+else:
     print("JSON data read from MT5 file:")
     print(json.dumps(data, indent=4))
-except FileNotFoundError:
-    print("File not found:", file_path)
-except json.JSONDecodeError as e:
-    print("Error decoding JSON:", e)
-except Exception as e:
-    print("An error occurred:", e)
+
+# python test.py --watch prints every new version of the file
+if "--watch" in sys.argv:
+    print(f"Watching {file_path} ({watcher.backend})...")
+    version = watcher.version
+    try:
+        while True:
+            time.sleep(0.5)
+            if watcher.version != version:
+                version = watcher.version
+                print(json.dumps(watcher.get(), indent=4))
+    except KeyboardInterrupt:
+        watcher.close()
 
 
 # FILE_PATH=C:/Users/User/AppData/Roaming/MetaQuotes/Terminal/4FBA2952F23B1029F2DE78CC8BF367AD/MQL5/Files/last_trade.json
@@ -1,20 +1,30 @@
-import MetaTrader5 as mt5
-import json
-from pathlib import Path
+import MetaTrader5
 import os
 from dotenv import load_dotenv
 import time
 import logging
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from Lib.utils.mt5_guard import MT5Guard
+from Lib.utils.symbol_cache import SymbolCache
+from Lib.utils.log_setup import setup_logging
+from Lib.utils.atr_engine import AtrEngine
+from Lib.utils.file_watch import JsonFileWatcher
+from Lib.utils.position_book import PositionBook
+
+mt5 = MT5Guard(MetaTrader5)
+symbol_cache = SymbolCache(mt5)
+# Current M5 ATR(14) per symbol, computed locally instead of read from the EA file
+atr_engine = AtrEngine(mt5, MetaTrader5.TIMEFRAME_M5)
 
 # Configure logging
 log_dir = "../../Lib/logs"
 os.makedirs(log_dir, exist_ok=True)
 
-logging.basicConfig(
-    filename=os.path.join(log_dir, "trailing_stop.log"),
-    level=logging.INFO,
-    format="%(asctime)s - %(message)s"
-)
+# File and console output are written by a background listener, so a disk
+# stall never delays an SL modification
+setup_logging(os.path.join(log_dir, "trailing_stop.log"), console=True)
 
 # Load environment variables
 load_dotenv()
@@ -24,8 +34,13 @@ login = int(os.getenv('MT5_LOGIN'))
 server = os.getenv('MT5_SERVER')
 password = os.getenv('MT5_PASSWORD')
 path = os.getenv('MT5_PATH')
-file_path = Path(os.getenv('FILE_PATH'))  # Path to ATR_Data.json
-original_atr_file = "..\\..\\json\\original_atr.json"  # File to store original ATR per ticket
+file_path = os.getenv('FILE_PATH')  # Optional EA ATR_Data.json, only cross-checked against the engine
+# Parsed once per change by a background watcher instead of re-decoded every pass
+ea_atr_file = JsonFileWatcher(file_path) if file_path else None
+original_atr_file = "..\\..\\json\\original_atr.json"  # File to store original ATR and trail tier per ticket
+
+# Open positions kept in memory and updated from deal deltas (full resync every 60s)
+position_book = PositionBook(mt5, original_atr_file)
 
 # Initialize MT5 connection
 def initialize_mt5():
@@ -33,67 +48,44 @@ def initialize_mt5():
         print("Initialization failed:", mt5.last_error())
         logging.error("MT5 initialization failed")
         return False
+    symbol_cache.invalidate()  # New session, re-read symbol specs
     print("Connected to MT5 Account:", mt5.account_info().name)
     logging.info("MT5 connected")
     return True
 
-# Load ATR from JSON (current ATR, but not used for original)
-def load_atr():
-    try:
-        json_text = file_path.read_text(encoding='utf-16')
-        atr_data = json.loads(json_text)
-        atr_value = atr_data.get('atr_value', 0.0)
-        logging.info(f"Loaded current ATR value: {atr_value}")
-        return atr_value
-    except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
-        logging.error(f"Error loading ATR from JSON: {e}")
-        print(f"Error loading ATR from JSON: {e}, skipping adjustments")
-        return 0.0
-
-# Load original ATRs from JSON
-def load_original_atrs():
-    try:
-        with open(original_atr_file, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-# Save original ATRs to JSON
-def save_original_atrs(original_atrs):
-    with open(original_atr_file, 'w') as f:
-        json.dump(original_atrs, f)
+# Current ATR for a symbol (not used for the original ATR)
+def load_atr(symbol):
+    atr_value = atr_engine.value(symbol)
+    logging.debug(f"Current ATR value for {symbol}: {atr_value}")
+    return atr_value
 
 # Main trailing stop logic
 def adjust_trailing_stops():
-    current_atr = load_atr()
-    if current_atr == 0.0:
-        print("Current ATR value is 0.0, skipping adjustments.")
-        logging.warning("Current ATR value is 0.0, skipping adjustments")
+    # Apply position changes since the last pass
+    if not position_book.refresh():
         return
 
-    # Load stored original ATRs
-    original_atrs = load_original_atrs()
-
-    # Get open positions
-    positions = mt5.positions_get()
-    if positions is None:
-        print("Failed to get positions:", mt5.last_error())
-        logging.error("Failed to get positions")
-        return
-
-    for position in positions:
+    # One ATR per symbol per pass, however many positions it has
+    atr_by_symbol = {}
+    for position in position_book.positions():
         symbol = position.symbol
         pos_type = position.type  # 0: BUY, 1: SELL
-        entry = position.price_open
+        entry = position.entry
         current_sl = position.sl
-        ticket = str(position.ticket)  # Use str for JSON key
+        ticket = position.ticket
+
+        if symbol not in atr_by_symbol:
+            atr_by_symbol[symbol] = load_atr(symbol)
+        if atr_by_symbol[symbol] == 0.0:
+            logging.warning(f"Current ATR value for {symbol} is 0.0, skipping adjustments")
+            continue
 
-        symbol_info = mt5.symbol_info(symbol)
+        symbol_info = symbol_cache.symbol_info(symbol)
         if symbol_info is None:
             logging.warning(f"Symbol info not found for {symbol}")
             continue
 
-        tick = mt5.symbol_info_tick(symbol)
+        tick = symbol_cache.symbol_info_tick(symbol)
         if tick is None:
             logging.warning(f"Tick info not found for {symbol}")
             continue
@@ -112,17 +104,16 @@ def adjust_trailing_stops():
             continue  # No adjustment if not in profit
 
         # Get or calculate original ATR
-        if ticket not in original_atrs:
+        if position.original_atr is None:
             # Assume current SL is initial, calculate original ATR
             original_atr = abs(entry - current_sl) / 2.0
             if original_atr == 0.0:
                 logging.warning(f"Calculated original ATR is 0.0 for ticket {ticket}, skipping")
                 continue
-            original_atrs[ticket] = original_atr
-            save_original_atrs(original_atrs)
+            position_book.set_original_atr(ticket, original_atr)
             logging.info(f"Calculated and saved original ATR {original_atr} for ticket {ticket}")
 
-        original_atr = original_atrs[ticket]
+        original_atr = position.original_atr
 
         profit_atr = profit / original_atr
 
@@ -152,6 +143,15 @@ def adjust_trailing_stops():
             else:  # SELL
                 new_sl = current_price + (trail_mult * original_atr)
 
+        position_book.set_trail_tier(ticket, 2 if profit_atr >= 4 else 1 if profit_atr >= 2 else 0)
+
+        # The book's SL can miss edits made outside this script until the next resync; confirm before modifying
+        if (pos_type == mt5.POSITION_TYPE_BUY and new_sl > current_sl) or (pos_type == mt5.POSITION_TYPE_SELL and new_sl < current_sl):
+            fresh = position_book.reload(ticket)
+            if fresh is None:
+                continue  # Closed in the meantime
+            current_sl = fresh.sl
+
         # Apply adjustment only if new SL is more favorable
         if pos_type == mt5.POSITION_TYPE_BUY and new_sl > current_sl:
             request = {
@@ -161,11 +161,12 @@ def adjust_trailing_stops():
                 "tp": 0.0  # No TP
             }
             result = mt5.order_send(request)
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
-                print(f"Adjusted SL for BUY position {position.ticket} to {new_sl}")
+            if result is None:
+                logging.error(f"Failed to adjust SL for {position.ticket}: {mt5.last_error()}")
+            elif result.retcode == mt5.TRADE_RETCODE_DONE:
+                position_book.update_sl(position.ticket, new_sl)
                 logging.info(f"Adjusted SL for BUY position {position.ticket} to {new_sl}")
             else:
-                print(f"Failed to adjust SL for {position.ticket}: {result.retcode}")
                 logging.error(f"Failed to adjust SL for {position.ticket}: {result.retcode}")
         elif pos_type == mt5.POSITION_TYPE_SELL and new_sl < current_sl:
             request = {
@@ -175,11 +176,12 @@ def adjust_trailing_stops():
                 "tp": 0.0  # No TP
             }
             result = mt5.order_send(request)
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
-                print(f"Adjusted SL for SELL position {position.ticket} to {new_sl}")
+            if result is None:
+                logging.error(f"Failed to adjust SL for {position.ticket}: {mt5.last_error()}")
+            elif result.retcode == mt5.TRADE_RETCODE_DONE:
+                position_book.update_sl(position.ticket, new_sl)
                 logging.info(f"Adjusted SL for SELL position {position.ticket} to {new_sl}")
             else:
-                print(f"Failed to adjust SL for {position.ticket}: {result.retcode}")
                 logging.error(f"Failed to adjust SL for {position.ticket}: {result.retcode}")
 
 # Main loop
@@ -189,13 +191,22 @@ if __name__ == "__main__":
         exit()
 
     try:
+        last_cross_check = 0.0
         while True:
             adjust_trailing_stops()
+            # The EA file is only compared against the engine, once per M5 bar
+            ea_atr = ea_atr_file.get(max_age=300) if ea_atr_file is not None else None
+            if ea_atr and time.monotonic() - last_cross_check >= 300:
+                atr_engine.cross_check(os.getenv('ATR_CHECK_SYMBOL', 'XAUUSD'), ea_atr.get('atr_value', 0.0))
+                last_cross_check = time.monotonic()
             time.sleep(9)  # Run every 7 seconds to match ATR update interval
     except KeyboardInterrupt:
         print("Script interrupted by user.")
         logging.info("Script interrupted by user")
     finally:
+        mt5.log_stats()
+        logging.info(f"Symbol cache: {symbol_cache.stats()}")
+        logging.info(f"Position book: {position_book.stats()}")
         mt5.shutdown()
         print("MT5 connection closed.")
         logging.info("MT5 connection closed")
\ No newline at end of file
@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+from Lib.utils.bar_aggregator import timeframe_minutes
+
+TIMEFRAME_M5 = 5    # mt5.TIMEFRAME_M5
+DEFAULT_PERIOD = 14
+SEED_BARS = 500     # closed bars used to seed a symbol; older bars no longer move a Wilder ATR
+CHECK_TOLERANCE = 0.10
+
+
+def smoothing_mode():
+    """ATR_SMOOTHING=sma reproduces MT5's built-in iATR (simple average of TR); default is Wilder's."""
+    return "sma" if os.getenv("ATR_SMOOTHING", "wilder").strip().lower() == "sma" else "wilder"
+
+
+def true_ranges(rates):
+    """True range of every bar after the first (the first has no previous close)."""
+    high, low, close = rates["high"][1:], rates["low"][1:], rates["close"][:-1]
+    return np.maximum(high - low, np.maximum(np.abs(high - close), np.abs(low - close)))
+
+
+class AtrEngine:
+    """
+    ATR per symbol on one timeframe, computed from the terminal's own bars.
+
+    A symbol is seeded from its last SEED_BARS closed bars on first use. After
+    that value() costs one copy_rates_from_pos(symbol, timeframe, 1, 1) probe,
+    and each newly closed bar is folded in with an O(1) update: Wilder's
+    ATR = (ATR * (n - 1) + TR) / n, or the simple average of the last n
+    true ranges when ATR_SMOOTHING=sma (what MT5's iATR, and so the EA
+    file, reports). A gap longer than SEED_BARS, or a failed catch-up,
+    re-seeds the symbol. Only closed bars are used, so the value is stable
+    within a bar.
+    """
+
+    def __init__(self, mt5_api, timeframe=TIMEFRAME_M5, period=DEFAULT_PERIOD, smoothing=None, seed_bars=SEED_BARS):
+        self._mt5 = mt5_api
+        self.timeframe = timeframe
+        self.period = period
+        self.smoothing = smoothing or smoothing_mode()
+        self.seed_bars = max(seed_bars, period + 1)
+        self._bar_seconds = (timeframe_minutes(timeframe) or 1) * 60
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def _step(self, state, bar):
+        prev_close = state["close"]
+        tr = max(bar["high"] - bar["low"], abs(bar["high"] - prev_close), abs(bar["low"] - prev_close))
+        if self.smoothing == "sma":
+            # Re-summing the n-bar window keeps the update O(1) in history length without float drift
+            state["window"].append(tr)
+            state["atr"] = sum(state["window"]) / len(state["window"])
+        else:
+            state["atr"] = (state["atr"] * (self.period - 1) + tr) / self.period
+        state["close"] = float(bar["close"])
+        state["time"] = int(bar["time"])
+
+    def _seed(self, symbol):
+        rates = self._mt5.copy_rates_from_pos(symbol, self.timeframe, 1, self.seed_bars)
+        if rates is None or len(rates) < self.period + 1:
+            logging.warning(f"ATR: not enough {symbol} history to seed ({0 if rates is None else len(rates)} bars)")
+            return None
+        tr = true_ranges(rates)
+        if self.smoothing == "sma":
+            window = deque(tr[-self.period:].tolist(), maxlen=self.period)
+            atr = float(np.mean(window))
+            state = {"window": window, "atr": atr}
+        else:
+            atr = float(tr[:self.period].mean())
+            for value in tr[self.period:]:
+                atr = (atr * (self.period - 1) + value) / self.period
+            state = {"atr": atr}
+        state.update(close=float(rates["close"][-1]), time=int(rates["time"][-1]))
+        return state
+
+    def _catch_up(self, symbol, state):
+        latest = self._mt5.copy_rates_from_pos(symbol, self.timeframe, 1, 1)
+        if latest is None or len(latest) == 0 or int(latest["time"][-1]) == state["time"]:
+            return state
+        behind = (int(latest["time"][-1]) - state["time"]) // self._bar_seconds + 1
+        if behind >= self.seed_bars:
+            return self._seed(symbol)
+        rates = self._mt5.copy_rates_from_pos(symbol, self.timeframe, 1, behind)
+        if rates is None or len(rates) == 0 or int(rates["time"][0]) > state["time"]:
+            return self._seed(symbol)
+        for bar in rates[rates["time"] > state["time"]]:
+            self._step(state, bar)
+        return state
+
+    def value(self, symbol):
+        """Current ATR for symbol in price units, or 0.0 when it can't be computed."""
+        with self._lock:
+            state = self._states.get(symbol)
+            state = self._seed(symbol) if state is None else self._catch_up(symbol, state)
+            if state is None:
+                self._states.pop(symbol, None)
+                return 0.0
+            self._states[symbol] = state
+            return float(state["atr"])
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+            else:
+                self._states.pop(symbol, None)
+
+    def cross_check(self, symbol, ea_value, tolerance=CHECK_TOLERANCE):
+        """
+        Compare against the EA's exported atr_value (optional); logs a warning
+        when they differ by more than tolerance (relative). Returns the engine value.
+        """
+        atr = self.value(symbol)
+        if ea_value and atr and abs(atr - ea_value) > tolerance * ea_value:
+            logging.warning(f"ATR cross-check {symbol}: engine {atr:.5f} ({self.smoothing}) vs EA file {ea_value:.5f}")
+        return atr
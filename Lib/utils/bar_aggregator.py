@@ -0,0 +1,133 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+# Same layout as the structured arrays returned by mt5.copy_rates_*
+RATES_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+])
+
+M1 = 1
+MAX_M1_BARS = 100_000  # terminal default for "max bars in chart"
+
+
+def timeframe_minutes(timeframe):
+    """
+    Minutes per bar for an MT5 TIMEFRAME_* constant, or None when the frame
+    can't be built from M1 (W1, MN1). Minute frames are the minute count;
+    hour frames are 0x4000 | hours (TIMEFRAME_H4 == 16388, TIMEFRAME_D1 == 16408).
+    """
+    if 0 < timeframe < 0x4000:
+        return timeframe
+    if timeframe & 0xC000 == 0x4000:
+        return (timeframe & 0x3FFF) * 60
+    return None
+
+
+def resample(m1, minutes):
+    """
+    Aggregate M1 rates into bars of `minutes`, aligned to server-time epoch
+    (bar time is a multiple of the period, so H4 starts at 00:00/04:00/...
+    server time exactly like the terminal's own bars). Spread is the bar's
+    minimum, as in MT5 history.
+    """
+    if minutes == 1 or len(m1) == 0:
+        return m1.copy()
+    period = minutes * 60
+    buckets = m1["time"] - m1["time"] % period
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(m1)] - 1
+    out = np.empty(len(starts), dtype=RATES_DTYPE)
+    out["time"] = buckets[starts]
+    out["open"] = m1["open"][starts]
+    out["high"] = np.maximum.reduceat(m1["high"], starts)
+    out["low"] = np.minimum.reduceat(m1["low"], starts)
+    out["close"] = m1["close"][ends]
+    out["tick_volume"] = np.add.reduceat(m1["tick_volume"], starts)
+    out["spread"] = np.minimum.reduceat(m1["spread"], starts)
+    out["real_volume"] = np.add.reduceat(m1["real_volume"], starts)
+    return out
+
+
+class BarAggregator:
+    """
+    Keeps one rolling M1 buffer per symbol and derives higher timeframes from it.
+
+    rates(symbol, timeframe, count) is a drop-in for
+    mt5.copy_rates_from_pos(symbol, timeframe, 0, count): the last `count` bars,
+    the forming bar included, as a copy_rates structured array (None on
+    failure). After the first call for a symbol, each refresh only asks the
+    terminal for the M1 bars since the previous refresh, so M2, M5 and H4
+    reads of the same symbol cost one small M1 fetch and share one source.
+    Timeframes that can't be built from M1 (W1, MN1) are fetched directly.
+    """
+
+    def __init__(self, mt5_api, min_refresh=0.0):
+        self._mt5 = mt5_api
+        self.min_refresh = min_refresh
+        self._lock = threading.Lock()
+        self._m1 = {}
+        self._refreshed = {}
+        self.fetched_bars = 0
+
+    def _fetch_m1(self, symbol, count):
+        rates = self._mt5.copy_rates_from_pos(symbol, M1, 0, count)
+        if rates is None or len(rates) == 0:
+            return None
+        self.fetched_bars += len(rates)
+        return np.asarray(rates).astype(RATES_DTYPE, copy=False)
+
+    def _refresh(self, symbol, need_bars):
+        now = time.monotonic()
+        buffer = self._m1.get(symbol)
+        if buffer is not None and len(buffer) >= need_bars and now - self._refreshed[symbol] < self.min_refresh:
+            return buffer
+
+        if buffer is None or len(buffer) < need_bars:
+            fresh = self._fetch_m1(symbol, min(need_bars, MAX_M1_BARS))
+            merged = fresh
+        else:
+            # Bars since the last refresh plus the previously forming bar, with some slack
+            elapsed_minutes = math.ceil((now - self._refreshed[symbol]) / 60)
+            fresh = self._fetch_m1(symbol, min(elapsed_minutes + 2, MAX_M1_BARS))
+            if fresh is not None and fresh["time"][0] > buffer["time"][-1]:
+                # Missed bars between refreshes (terminal was away): reload the full window
+                fresh = self._fetch_m1(symbol, min(max(need_bars, len(buffer)), MAX_M1_BARS))
+                merged = fresh
+            elif fresh is not None:
+                keep = buffer[buffer["time"] < fresh["time"][0]]
+                merged = np.concatenate([keep, fresh])
+            else:
+                merged = None
+
+        if merged is None:
+            return None
+        keep_bars = max(need_bars, len(buffer) if buffer is not None else 0)
+        merged = merged[-min(keep_bars, MAX_M1_BARS):]
+        self._m1[symbol] = merged
+        self._refreshed[symbol] = now
+        return merged
+
+    def rates(self, symbol, timeframe, count):
+        minutes = timeframe_minutes(timeframe)
+        if minutes is None:
+            return self._mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+        # One extra period so the oldest returned bar is never cut short by the buffer's start
+        need_bars = (count + 1) * minutes if minutes > 1 else count
+        with self._lock:
+            m1 = self._refresh(symbol, need_bars)
+        if m1 is None:
+            return None
+        return resample(m1, minutes)[-count:]
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._m1.clear()
+                self._refreshed.clear()
+            else:
+                self._m1.pop(symbol, None)
+                self._refreshed.pop(symbol, None)
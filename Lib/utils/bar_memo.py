@@ -0,0 +1,64 @@
+import threading
+
+# Fields of the latest bar the detectors depend on; tick_volume/spread ticks alone don't change a result
+KEY_FIELDS = ("time", "open", "high", "low", "close")
+
+
+class BarMemo:
+    """
+    Skips the fetch and the computation while the latest bars are unchanged.
+
+    run() first probes each symbol's latest bar with a one-bar
+    copy_rates_from_pos (the forming bar, since the detectors read it) and
+    keys on its time and OHLC. When the key matches the previous run the
+    cached result is returned without the full rates fetch, so idle runs
+    (weekends, holidays, quiet minutes) cost one tiny call per symbol. A
+    failed probe disables the memo for that run. The key is taken before the
+    fetch, so a tick landing in between only causes one extra recompute.
+    """
+
+    def __init__(self, mt5_api):
+        self._mt5 = mt5_api
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, symbols, timeframe):
+        """Key of the symbols' latest bars, or None when a probe fails."""
+        key = []
+        for symbol in symbols:
+            bar = self._mt5.copy_rates_from_pos(symbol, timeframe, 0, 1)
+            if bar is None or len(bar) == 0:
+                return None
+            key.append((symbol, tuple(bar[-1][field].item() for field in KEY_FIELDS)))
+        return tuple(key)
+
+    def run(self, name, symbols, timeframe, fetch, compute):
+        """
+        compute(fetch()) unless the latest bars of symbols on timeframe are
+        unchanged since the last run, in which case the cached result is
+        returned and fetch() is skipped. None when fetch() returned nothing.
+        """
+        key = self.probe(symbols, timeframe)
+        with self._lock:
+            entry = self._entries.get(name)
+            if key is not None and entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        rates_by_symbol = fetch()
+        if not rates_by_symbol:
+            return None
+        result = compute(rates_by_symbol)
+        if key is not None and result is not None:
+            with self._lock:
+                self._entries[name] = (key, result)
+        return result
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
@@ -0,0 +1,174 @@
+import os
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import pandas as pd
+
+# Same fields as MetaTrader5's TradeDeal, so stored rows are drop-in replacements
+DEAL_COLUMNS = [
+    "ticket", "order", "time", "time_msc", "type", "entry", "magic", "position_id", "reason",
+    "volume", "price", "commission", "swap", "profit", "fee", "symbol", "comment", "external_id",
+]
+Deal = namedtuple("Deal", DEAL_COLUMNS)
+
+# First day of history kept in the warehouse (previously hard-coded in history.py/excel.py)
+HISTORY_START = datetime(2025, 7, 26)
+
+# Re-query this far behind the newest stored deal; duplicates are ignored by ticket.
+# Covers the gap between broker server time and local time.
+SYNC_OVERLAP = 24 * 3600
+
+ASSETS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    ticket INTEGER PRIMARY KEY,
+    "order" INTEGER,
+    time INTEGER NOT NULL,
+    time_msc INTEGER,
+    type INTEGER,
+    entry INTEGER,
+    magic INTEGER,
+    position_id INTEGER,
+    reason INTEGER,
+    volume REAL,
+    price REAL,
+    commission REAL,
+    swap REAL,
+    profit REAL,
+    fee REAL,
+    symbol TEXT,
+    comment TEXT,
+    external_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_deals_position_id ON deals(position_id);
+CREATE INDEX IF NOT EXISTS idx_deals_time ON deals(time);
+CREATE INDEX IF NOT EXISTS idx_deals_magic ON deals(magic);
+"""
+
+_QUOTED_COLUMNS = ", ".join(f'"{c}"' for c in DEAL_COLUMNS)
+
+
+def default_db_path(login):
+    """One warehouse per trading account, under Lib/assets."""
+    return os.path.join(ASSETS_DIR, f"deals_{login}.sqlite")
+
+
+def _deal_row(deal):
+    return tuple(getattr(deal, c) for c in DEAL_COLUMNS)
+
+
+class DealStore:
+    """
+    Local SQLite copy of the account's deal history.
+
+    sync() pulls only deals newer than the last stored ticket (minus a small
+    overlap) from the terminal; everything else — reports, the daily P/L gate —
+    queries the local table.
+    """
+
+    def __init__(self, db_path, mt5_api=None):
+        self.db_path = db_path
+        self._mt5 = mt5_api
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def last_deal(self):
+        """(ticket, time) of the newest stored deal, or None when empty."""
+        return self._conn.execute("SELECT ticket, time FROM deals ORDER BY ticket DESC LIMIT 1").fetchone()
+
+    def insert(self, deals):
+        before = self._conn.total_changes
+        self._conn.executemany(
+            f"INSERT OR IGNORE INTO deals ({_QUOTED_COLUMNS}) VALUES ({', '.join('?' * len(DEAL_COLUMNS))})",
+            (_deal_row(d) for d in deals),
+        )
+        self._conn.commit()
+        return self._conn.total_changes - before
+
+    def sync(self, start=HISTORY_START):
+        """
+        Fetch deals newer than the last stored one from the terminal.
+        Returns the number of new deals, or None if the terminal query failed.
+        """
+        last = self.last_deal()
+        from_ts = int(start.timestamp()) if last is None else last[1] - SYNC_OVERLAP
+        to_ts = int(time.time()) + SYNC_OVERLAP
+        deals = self._mt5.history_deals_get(from_ts, to_ts)
+        if deals is None:
+            return None
+        return self.insert(deals)
+
+    def _where(self, date_from, date_to, magic, symbol):
+        clauses, params = [], []
+        if date_from is not None:
+            clauses.append("time >= ?")
+            params.append(int(date_from))
+        if date_to is not None:
+            clauses.append("time <= ?")
+            params.append(int(date_to))
+        if magic is not None:
+            clauses.append("magic = ?")
+            params.append(magic)
+        if symbol is not None:
+            clauses.append("symbol = ?")
+            params.append(symbol)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def deals(self, date_from=None, date_to=None, magic=None, symbol=None):
+        """Stored deals as Deal namedtuples (attribute-compatible with TradeDeal), ordered by time."""
+        where, params = self._where(date_from, date_to, magic, symbol)
+        rows = self._conn.execute(f"SELECT {_QUOTED_COLUMNS} FROM deals{where} ORDER BY time, ticket", params)
+        return [Deal(*row) for row in rows]
+
+    def to_frame(self, date_from=None, date_to=None, magic=None, symbol=None):
+        where, params = self._where(date_from, date_to, magic, symbol)
+        return pd.read_sql_query(f"SELECT {_QUOTED_COLUMNS} FROM deals{where} ORDER BY time, ticket",
+                                 self._conn, params=params)
+
+    def profit_between(self, date_from, date_to, deal_types):
+        """Sum of profit for deals of the given types with date_from <= time <= date_to."""
+        marks = ", ".join("?" * len(deal_types))
+        row = self._conn.execute(
+            f"SELECT COALESCE(SUM(profit), 0.0) FROM deals WHERE time >= ? AND time <= ? AND type IN ({marks})",
+            [int(date_from), int(date_to), *deal_types],
+        ).fetchone()
+        return float(row[0])
+
+    def export_parquet(self, out_dir, months=None):
+        """
+        Write one Parquet file per calendar month (deals_YYYY-MM.parquet).
+        Pass months=['2025-10', ...] to rewrite only those partitions.
+        Returns the list of written paths.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        df = self.to_frame()
+        if df.empty:
+            return []
+        month = pd.to_datetime(df["time"], unit="s").dt.strftime("%Y-%m")
+        written = []
+        for key, part in df.groupby(month, sort=True):
+            if months is not None and key not in months:
+                continue
+            out_path = os.path.join(out_dir, f"deals_{key}.parquet")
+            part.to_parquet(out_path, index=False)
+            written.append(out_path)
+        return written
+
+
+if __name__ == "__main__":
+    # Usage: python deal_store.py <db_path> <out_dir> [YYYY-MM ...]
+    if len(sys.argv) < 3:
+        print("Usage: python deal_store.py <db_path> <out_dir> [YYYY-MM ...]")
+        sys.exit(1)
+    store = DealStore(sys.argv[1])
+    paths = store.export_parquet(sys.argv[2], months=sys.argv[3:] or None)
+    print(f"Exported {len(paths)} monthly partitions to {sys.argv[2]}")
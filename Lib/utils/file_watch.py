@@ -0,0 +1,161 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+POLL_INTERVAL = 1.0   # seconds between stat() calls when inotify is unavailable
+
+# inotify(7)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT = struct.Struct("iIII")   # wd, mask, cookie, name length
+
+
+def _inotify_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class JsonFileWatcher:
+    """
+    Keeps the parsed contents of a JSON file written by another process (the
+    EA's UTF-16 exports) up to date in the background.
+
+    On Linux a daemon thread blocks on inotify events for the file's
+    directory; elsewhere, or when inotify can't be set up, it polls the file's
+    (mtime, size) every POLL_INTERVAL seconds. Either way the file is decoded
+    and parsed once per change. A write caught half-way (empty file, truncated
+    JSON, odd byte count) keeps the last good value and is picked up again
+    when the writer finishes and the file changes once more, so readers never
+    see a partial file as an error.
+
+    get() is an O(1) read of the last good value; with max_age it returns None
+    once the file behind that value was last written more than max_age
+    seconds ago (by its mtime), i.e. the writer has stopped updating it.
+    """
+
+    def __init__(self, path, encoding='utf-16', poll_interval=POLL_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.encoding = encoding
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._value = None
+        self._signature = None   # (mtime_ns, size) of the last good parse
+        self._failed = None      # (mtime_ns, size) that did not parse; not re-read until it changes
+        self.error = None
+        self.version = 0         # bumped on every successful parse
+        self._reload()
+        self.backend = "poll"
+        fd = self._inotify_fd()
+        if fd is not None:
+            self.backend = "inotify"
+        self._thread = threading.Thread(target=self._watch_inotify if fd is not None else self._watch_poll,
+                                        args=(fd,) if fd is not None else (), name="JsonFileWatcher", daemon=True)
+        self._thread.start()
+
+    # Loading -------------------------------------------------------------
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _reload(self):
+        """Parse the file if it changed since the last attempt."""
+        signature = self._stat()
+        if signature is None:
+            self.error = f"{self.path} not found"
+            return
+        if signature == self._signature or signature == self._failed:
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                value = json.loads(f.read().decode(self.encoding))
+        except (OSError, UnicodeError, ValueError) as e:
+            self._failed = signature
+            self.error = f"{type(e).__name__}: {e}"
+            return
+        with self._lock:
+            self._value = value
+            self._signature = signature
+            self.error = None
+            self.version += 1
+
+    # Watching ------------------------------------------------------------
+
+    def _inotify_fd(self):
+        libc = _inotify_libc()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(fd, os.path.dirname(self.path).encode(), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    def _watch_inotify(self, fd):
+        name = os.path.basename(self.path).encode()
+        try:
+            while not self._stop.is_set():
+                # Bounded wait so close() is noticed
+                ready, _, _ = select.select([fd], [], [], 1.0)
+                if not ready:
+                    continue
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                offset, touched = 0, False
+                while offset + EVENT.size <= len(data):
+                    _, _, _, length = EVENT.unpack_from(data, offset)
+                    event_name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+                    touched = touched or event_name == name
+                    offset += EVENT.size + length
+                if touched:
+                    self._reload()
+        finally:
+            os.close(fd)
+
+    def _watch_poll(self):
+        while not self._stop.wait(self.poll_interval):
+            self._reload()
+
+    # Reading -------------------------------------------------------------
+
+    def age(self):
+        """Seconds since the file behind the value was written (its mtime), or None before the first good read."""
+        signature = self._signature
+        return None if signature is None else time.time() - signature[0] / 1e9
+
+    def get(self, max_age=None):
+        """Last good parsed value, or None if there is none or its file was written more than max_age seconds ago."""
+        with self._lock:
+            value, signature = self._value, self._signature
+        if signature is None or (max_age is not None and time.time() - signature[0] / 1e9 > max_age):
+            return None
+        return value
+
+    def close(self):
+        self._stop.set()
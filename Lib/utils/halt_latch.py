@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pytz
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_PATH = os.path.join(ROOT, "json", "halt_state.json")
+DEFAULT_TIMEZONE = "Africa/Nairobi"
+
+
+def next_midnight(timezone, now=None):
+    """Start of the next calendar day in timezone."""
+    now = now or datetime.now(timezone)
+    tomorrow = (now + timedelta(days=1)).date()
+    return timezone.localize(datetime(tomorrow.year, tomorrow.month, tomorrow.day))
+
+
+class HaltLatch:
+    """
+    Persisted "halted until" latch per account and limit type.
+
+    Once a daily loss or drawdown limit is hit, halt() records it until the
+    next midnight in the trading timezone, so later cycles that day stop at an
+    O(1) dictionary lookup instead of re-running the day/time checks and the
+    deal history queries. The state lives in json/halt_state.json and
+    survives restarts; it is re-read when the file changes (e.g. cleared with
+    the CLI below), and expired entries drop out on their own.
+
+        python halt_latch.py show
+        python halt_latch.py clear [login] [limit]
+    """
+
+    def __init__(self, path=DEFAULT_PATH, timezone=None):
+        self.path = path
+        self.timezone = timezone or pytz.timezone(DEFAULT_TIMEZONE)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._halts = {}
+
+    @staticmethod
+    def _key(login, limit):
+        return f"{login}:{limit}"
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self._mtime, self._halts = None, {}
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self._halts = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self._halts = {}
+        self._mtime = mtime
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._halts, f, indent=4)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def active(self, login, now=None):
+        """The latest active halt for login as a dict (limit, until, reason), or None."""
+        now = now or datetime.now(self.timezone)
+        with self._lock:
+            self._reload()
+            active = None
+            for key, halt in self._halts.items():
+                if not key.startswith(f"{login}:"):
+                    continue
+                until = datetime.fromisoformat(halt["until"])
+                if until > now and (active is None or until > active["until"]):
+                    active = {"limit": key.split(":", 1)[1], "until": until, "reason": halt["reason"]}
+            return active
+
+    def halt(self, login, limit, reason, until=None):
+        """Latch login/limit until `until` (default: the next midnight in the trading timezone)."""
+        until = until or next_midnight(self.timezone)
+        with self._lock:
+            self._reload()
+            now = datetime.now(self.timezone)
+            # Drop expired entries while rewriting the file
+            self._halts = {k: h for k, h in self._halts.items() if datetime.fromisoformat(h["until"]) > now}
+            self._halts[self._key(login, limit)] = {
+                "until": until.isoformat(),
+                "reason": reason,
+                "set_at": now.isoformat(timespec="seconds"),
+            }
+            self._save()
+        return until
+
+    def clear(self, login=None, limit=None):
+        """Manual override: clear every halt, all halts of one login, or one login/limit. Returns how many."""
+        with self._lock:
+            self._reload()
+            keep = {k: h for k, h in self._halts.items()
+                    if not ((login is None or k.startswith(f"{login}:"))
+                            and (limit is None or k.endswith(f":{limit}")))}
+            cleared = len(self._halts) - len(keep)
+            self._halts = keep
+            self._save()
+        return cleared
+
+
+if __name__ == "__main__":
+    latch = HaltLatch()
+    command = sys.argv[1] if len(sys.argv) > 1 else "show"
+    if command == "clear":
+        login = sys.argv[2] if len(sys.argv) > 2 else None
+        limit = sys.argv[3] if len(sys.argv) > 3 else None
+        print(f"Cleared {latch.clear(login, limit)} halt(s)")
+    elif command == "show":
+        latch._reload()
+        if not latch._halts:
+            print("No halts recorded")
+        for key, halt in latch._halts.items():
+            print(f"{key}: until {halt['until']} ({halt['reason']})")
+    else:
+        print("Usage: python halt_latch.py show | clear [login] [limit]")
+        sys.exit(1)
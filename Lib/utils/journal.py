@@ -0,0 +1,82 @@
+import atexit
+import glob
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+def _to_json(value):
+    # numpy scalars, pandas Timestamps and anything else json can't encode natively
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _clean(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class DecisionJournal:
+    """
+    Append-only JSONL journal, one compact record per evaluated bar.
+
+    Records are buffered in memory and written in one append when the buffer
+    holds buffer_size records or the oldest buffered record is older than
+    flush_interval seconds; the buffer is also flushed at interpreter exit.
+    Files roll over daily (UTC) as <prefix>_YYYY-MM-DD.jsonl.
+    """
+
+    def __init__(self, directory, prefix="decisions", buffer_size=64, flush_interval=30.0):
+        self.directory = directory
+        self.prefix = prefix
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._first_buffered = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.flush)
+
+    def _path_for(self, day):
+        return os.path.join(self.directory, f"{self.prefix}_{day}.jsonl")
+
+    def record(self, **fields):
+        now = datetime.now(timezone.utc)
+        fields = {"logged_at": now.isoformat(timespec="seconds"), **{k: _clean(v) for k, v in fields.items()}}
+        line = json.dumps(fields, separators=(",", ":"), default=_to_json)
+        with self._lock:
+            if not self._buffer:
+                self._first_buffered = time.monotonic()
+            self._buffer.append((now.strftime("%Y-%m-%d"), line))
+            due = (len(self._buffer) >= self.buffer_size
+                   or time.monotonic() - self._first_buffered >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            buffered, self._buffer = self._buffer, []
+        if not buffered:
+            return
+        by_day = {}
+        for day, line in buffered:
+            by_day.setdefault(day, []).append(line)
+        for day, lines in by_day.items():
+            with open(self._path_for(day), "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+
+def load_journal(directory, prefix="decisions"):
+    """Load all journal files into one DataFrame, oldest first."""
+    import pandas as pd
+    paths = sorted(glob.glob(os.path.join(directory, f"{prefix}_*.jsonl")))
+    if not paths:
+        return pd.DataFrame()
+    return pd.concat([pd.read_json(p, lines=True) for p in paths], ignore_index=True)
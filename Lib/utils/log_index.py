@@ -0,0 +1,191 @@
+import bisect
+import glob
+import gzip
+import json
+import os
+import re
+import zlib
+
+# Log lines start with "YYYY-MM-DD HH:MM:SS,mmm - "; the first 19 characters sort chronologically
+TIMESTAMP_RE = re.compile(rb"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} - ")
+TS_LEN = 19
+BLOCK_BYTES = 64 * 1024
+INDEX_SUFFIX = ".idx"
+
+
+def line_timestamp(raw):
+    """Timestamp prefix of a log line as bytes, or None for continuation lines."""
+    return raw[:TS_LEN] if TIMESTAMP_RE.match(raw) else None
+
+
+def _gzip_member(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    return compressor.compress(data) + compressor.flush()
+
+
+def build_indexed_segment(source, dest, block_bytes=BLOCK_BYTES):
+    """
+    Compress source into dest as a series of independent gzip members of about
+    block_bytes each (a valid .gz file, readable by any gzip tool) and write a
+    sidecar dest.idx mapping the first timestamp of each member to its byte
+    offset. Blocks only start on timestamped lines, so a seek to any member
+    lands on the start of a log record.
+    """
+    blocks = []
+    first_ts = last_ts = None
+    offset = 0
+    pending, pending_size, pending_ts = [], 0, None
+
+    with open(source, "rb") as f_in, open(dest, "wb") as f_out:
+        def flush():
+            nonlocal offset, pending, pending_size, pending_ts
+            if not pending:
+                return
+            member = _gzip_member(b"".join(pending))
+            f_out.write(member)
+            blocks.append([pending_ts.decode() if pending_ts else None, offset])
+            offset += len(member)
+            pending, pending_size, pending_ts = [], 0, None
+
+        for raw in f_in:
+            ts = line_timestamp(raw)
+            if ts is not None:
+                if pending_size >= block_bytes:
+                    flush()
+                first_ts = first_ts or ts
+                last_ts = ts
+                if pending_ts is None:
+                    pending_ts = ts
+            pending.append(raw)
+            pending_size += len(raw)
+        flush()
+
+    # A leading block of continuation lines takes the first timestamp seen
+    for block in blocks:
+        if block[0] is None:
+            block[0] = first_ts.decode() if first_ts else ""
+    index = {
+        "first_ts": first_ts.decode() if first_ts else None,
+        "last_ts": last_ts.decode() if last_ts else None,
+        "blocks": blocks,
+    }
+    tmp_index = dest + INDEX_SUFFIX + ".tmp"
+    with open(tmp_index, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_index, dest + INDEX_SUFFIX)
+    return index
+
+
+def load_index(segment):
+    try:
+        with open(segment + INDEX_SUFFIX, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _emit_window(lines, start, end):
+    """Yield lines whose record timestamp is within [start, end]; stop past end."""
+    inside = False
+    for raw in lines:
+        ts = line_timestamp(raw)
+        if ts is not None:
+            if ts > end:
+                return
+            inside = ts >= start
+        if inside:
+            yield raw.decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+def _query_segment(segment, start, end):
+    index = load_index(segment)
+    if index is None:
+        # Segment without a sidecar (e.g. rotated before indexing): full scan
+        with gzip.open(segment, "rb") as f:
+            yield from _emit_window(f, start, end)
+        return
+    # No timestamped record at all (first/last_ts None): nothing can fall in the window
+    if not index["blocks"] or index["first_ts"] is None or index["last_ts"] is None:
+        return
+    if index["last_ts"] < start.decode() or index["first_ts"] > end.decode():
+        return
+    block_ts = [b[0] for b in index["blocks"]]
+    # Timestamps are cut to the second, so the start second can also fill the
+    # end of the block before the first block stamped with it: start there
+    i = max(0, bisect.bisect_left(block_ts, start.decode()) - 1)
+    with open(segment, "rb") as raw_file:
+        raw_file.seek(index["blocks"][i][1])
+        with gzip.GzipFile(fileobj=raw_file, mode="rb") as f:
+            yield from _emit_window(f, start, end)
+
+
+def _line_start_at_or_after(f, pos):
+    # Stepping back one byte means a pos that already starts a line is kept
+    if pos <= 0:
+        f.seek(0)
+    else:
+        f.seek(pos - 1)
+        f.readline()
+    return f.tell()
+
+
+def _seek_active(f, size, start):
+    """Binary search an uncompressed log for the first record at or after start."""
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        _line_start_at_or_after(f, mid)
+        ts = None
+        while ts is None:
+            pos = f.tell()
+            raw = f.readline()
+            if not raw:
+                break
+            ts = line_timestamp(raw)
+        if ts is None or ts >= start:
+            hi = mid
+        else:
+            lo = pos + 1
+    return _line_start_at_or_after(f, lo)
+
+
+def _query_active(log_path, start, end):
+    if not os.path.exists(log_path):
+        return
+    with open(log_path, "rb") as f:
+        f.seek(_seek_active(f, os.path.getsize(log_path), start))
+        yield from _emit_window(f, start, end)
+
+
+def _segment_sort_key(segment):
+    index = load_index(segment)
+    return (index or {}).get("first_ts") or "", os.path.getmtime(segment)
+
+
+def query_window(log_path, start, end):
+    """
+    Yield every line of log_path and its rotated segments between start and end
+    (strings like '2025-10-16 11:34' or '2025-10-16 11:34:00'), in time order.
+    """
+    start = (start + "0000-01-01 00:00:00"[len(start):]).encode()[:TS_LEN]
+    end = (end + "9999-12-31 23:59:59"[len(end):]).encode()[:TS_LEN]
+    segments = sorted(glob.glob(glob.escape(log_path) + ".*.gz"), key=_segment_sort_key)
+    for segment in segments:
+        yield from _query_segment(segment, start, end)
+    yield from _query_active(log_path, start, end)
+
+
+def reindex_segment(segment):
+    """Rewrite a plain gzip segment as an indexed one (for segments rotated before indexing)."""
+    plain = segment + ".plain"
+    with gzip.open(segment, "rb") as f_in, open(plain, "wb") as f_out:
+        while True:
+            chunk = f_in.read(1024 * 1024)
+            if not chunk:
+                break
+            f_out.write(chunk)
+    tmp = segment + ".tmp"
+    build_indexed_segment(plain, tmp)
+    os.replace(tmp, segment)
+    os.replace(tmp + INDEX_SUFFIX, segment + INDEX_SUFFIX)
+    os.remove(plain)
@@ -0,0 +1,106 @@
+import atexit
+import glob
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+from Lib.utils.log_index import INDEX_SUFFIX, build_indexed_segment
+
+LOG_FORMAT = "%(asctime)s - %(message)s"
+MAX_BYTES = 20 * 1024 * 1024  # Roll over at 20 MB even within the day
+BACKUP_COUNT = 60
+
+_listener = None
+
+
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    Rolls over at the time boundary (midnight by default) or when the file
+    would exceed max_bytes, whichever comes first. Rotated segments are
+    gzip-compressed as <logfile>.<date>[_N].gz in independent ~64 KB blocks,
+    with a <segment>.idx timestamp index alongside (see log_index.py).
+    """
+
+    def __init__(self, filename, max_bytes=MAX_BYTES, when="midnight", backup_count=BACKUP_COUNT, encoding="utf-8"):
+        super().__init__(filename, when=when, backupCount=backup_count, encoding=encoding, delay=True)
+        self.max_bytes = max_bytes
+        self.namer = self._unique_gz_name
+        self.rotator = self._compress
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes
+
+    @staticmethod
+    def _unique_gz_name(default_name):
+        # Several size-based rollovers in one period would otherwise share a name
+        candidate = default_name + ".gz"
+        n = 1
+        while os.path.exists(candidate):
+            candidate = f"{default_name}_{n}.gz"
+            n += 1
+        return candidate
+
+    @staticmethod
+    def _compress(source, dest):
+        build_indexed_segment(source, dest)
+        os.remove(source)
+
+    def getFilesToDelete(self):
+        segments = sorted(glob.glob(glob.escape(self.baseFilename) + ".*.gz"), key=os.path.getmtime)
+        if len(segments) <= self.backupCount:
+            return []
+        expired = segments[:len(segments) - self.backupCount]
+        return expired + [s + INDEX_SUFFIX for s in expired if os.path.exists(s + INDEX_SUFFIX)]
+
+
+def setup_logging(filename, level=None, console=False, max_bytes=MAX_BYTES, when="midnight", backup_count=BACKUP_COUNT):
+    """
+    Route all logging through a QueueHandler; a background QueueListener does
+    the file (and optional console) writes, so a slow disk never stalls the
+    calling thread. Level defaults to LOG_LEVEL from the environment (INFO).
+    """
+    if level is None:
+        level = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    file_handler = SizedTimedRotatingFileHandler(filename, max_bytes=max_bytes, when=when, backup_count=backup_count)
+    file_handler.setFormatter(formatter)
+    handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers.append(console_handler)
+
+    stop_logging()  # Calling setup twice replaces the previous listener
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    global _listener
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread (also runs at exit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,128 @@
+import asyncio
+import functools
+import logging
+import time
+
+from Lib.utils.mt5_guard import INLINE_CALLS, NO_ABANDON_CALLS
+
+
+class AsyncMT5:
+    """
+    asyncio facade over an MT5Guard so the trailer, detectors and signal engine
+    can share one event loop and one terminal connection.
+
+    Calls are queued straight onto the guard's worker thread (no extra thread
+    hop) and awaited without blocking the loop, with the guard's timeouts,
+    stuck-call rejection and circuit breaker applied as in guard.call(), so
+    the terminal only ever sees one request at a time. Identical read
+    requests that are already in flight are coalesced: the second caller
+    awaits the first caller's result instead of issuing a duplicate query.
+    order_send is never coalesced. Only constants are exposed as attributes;
+    terminal functions go through `await amt5.call(name, ...)`.
+
+    Usage:
+        amt5 = AsyncMT5(MT5Guard(MetaTrader5))
+        rates = await amt5.rates("XAUUSD", amt5.TIMEFRAME_M1, 5)
+        tick = await amt5.tick("XAUUSD")
+        result = await amt5.send(request)
+    """
+
+    def __init__(self, guard):
+        self._guard = guard
+        self._inflight = {}
+        self.coalesced = 0
+
+    def __getattr__(self, name):
+        # Constants (TIMEFRAME_M1, ORDER_TYPE_BUY, ...) come straight from the guard;
+        # its blocking functions are not handed out, they would stall the event loop
+        if name == "_guard":
+            raise AttributeError(name)
+        attr = getattr(self._guard, name)
+        if callable(attr):
+            raise AttributeError(f"{name} blocks; use `await amt5.call({name!r}, ...)`")
+        return attr
+
+    async def _run(self, name, args, kwargs):
+        if name in INLINE_CALLS:
+            return self._guard.call(name, *args, **kwargs)
+        started = time.perf_counter()
+        submitted = self._guard.submit(name, *args, **kwargs)
+        if submitted is None:
+            return None
+        future, timeout = submitted
+        waiter = asyncio.wrap_future(future)
+        timed_out_after = None
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if name in NO_ABANDON_CALLS:
+                logging.warning(f"MT5 {name} still running after {timeout:.1f}s; waiting for its result")
+                await asyncio.wait([waiter])
+            else:
+                timed_out_after = timeout
+        except Exception:
+            pass   # Reported by settle()
+        return self._guard.settle(name, future, started, timed_out_after)
+
+    async def call(self, name, *args, coalesce=True, **kwargs):
+        """Await guard.call(name, *args, **kwargs) on the guard's worker without blocking the loop."""
+        key = (name, args, tuple(sorted(kwargs.items()))) if coalesce else None
+        if key is not None:
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                return await asyncio.shield(pending)
+
+        future = asyncio.ensure_future(self._run(name, args, kwargs))
+        if key is not None:
+            self._inflight[key] = future
+            future.add_done_callback(functools.partial(self._forget, key))
+        # Shield so one cancelled awaiter does not cancel the shared request
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def rates(self, symbol, timeframe, count, start_pos=0):
+        return await self.call("copy_rates_from_pos", symbol, timeframe, start_pos, count)
+
+    async def tick(self, symbol):
+        return await self.call("symbol_info_tick", symbol)
+
+    async def symbol_info(self, symbol):
+        return await self.call("symbol_info", symbol)
+
+    async def positions(self, **filters):
+        return await self.call("positions_get", **filters)
+
+    async def deals(self, date_from, date_to, **filters):
+        return await self.call("history_deals_get", date_from, date_to, **filters)
+
+    async def send(self, request):
+        return await self.call("order_send", request, coalesce=False)
+
+
+async def periodic(interval, func, *args, name=None):
+    """
+    Run `await func(*args)` every `interval` seconds, the asyncio replacement for
+    `while True: schedule.run_pending(); time.sleep(...)`. Exceptions are logged
+    and the loop keeps going so one failing component cannot stop the others.
+    """
+    name = name or getattr(func, "__name__", "task")
+    loop = asyncio.get_running_loop()
+    next_run = loop.time()
+    while True:
+        try:
+            await func(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logging.exception(f"{name} failed")
+        next_run += interval
+        delay = next_run - loop.time()
+        if delay < 0:
+            # Overran the interval; skip missed runs rather than bursting
+            next_run = loop.time()
+            delay = 0
+        await asyncio.sleep(delay)
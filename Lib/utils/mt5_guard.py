@@ -0,0 +1,280 @@
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout, wait
+
+# Default per-call timeouts in seconds; anything not listed uses DEFAULT_TIMEOUT
+DEFAULT_TIMEOUT = 5.0
+CALL_TIMEOUTS = {
+    "initialize": 60.0,
+    "shutdown": 10.0,
+    "history_deals_get": 20.0,
+    "copy_rates_from_pos": 10.0,
+    "copy_rates_range": 10.0,
+    "order_send": 15.0,
+    "positions_get": 5.0,
+    "symbol_info_tick": 3.0,
+    "symbol_info": 3.0,
+    "symbols_get": 10.0,
+}
+
+# Calls that never talk to the terminal and are safe to run inline
+INLINE_CALLS = {"last_error", "version"}
+
+# Calls that are never abandoned: a timed-out order_send may still be executed
+# by the terminal, so it is waited for and its real result returned
+NO_ABANDON_CALLS = {"order_send"}
+
+
+class _Worker:
+    """Single daemon thread running terminal calls one at a time, in submission order."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="mt5-worker", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def shutdown(self):
+        self._queue.put(None)
+
+
+class CallStats:
+    """Latency and outcome counters for one MT5 function."""
+
+    def __init__(self, window=256):
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, elapsed_ms):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.recent.append(elapsed_ms)
+
+    def percentile(self, q):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        idx = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class MT5Guard:
+    """
+    Runs MetaTrader5 calls on a dedicated worker thread with per-call timeouts
+    and a circuit breaker.
+
+    A call that times out is abandoned but never overlapped: the MT5 API is not
+    thread-safe, so until the terminal returns from it every other call is
+    rejected. order_send is never abandoned, since the terminal may still
+    execute the order; it is waited for past its timeout. The worker is a
+    daemon thread and does not hold up interpreter exit.
+
+    Attribute access mirrors the MetaTrader5 module, so `guard.positions_get()`
+    is a drop-in for `mt5.positions_get()` and constants such as
+    `guard.TIMEFRAME_M1` pass straight through. Like the MT5 API itself, a call
+    that times out, raises or is rejected by an open circuit returns None; the
+    reason is available from `guard.last_error()`.
+
+    Parameters:
+    - mt5_module: the imported MetaTrader5 module
+    - failure_threshold: consecutive failures (timeouts/exceptions) that open the circuit
+    - reset_after: seconds the circuit stays open before a single trial call is allowed
+    - timeouts: optional overrides for CALL_TIMEOUTS
+    """
+
+    def __init__(self, mt5_module, failure_threshold=3, reset_after=30.0, timeouts=None):
+        self._mt5 = mt5_module
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.timeouts = dict(CALL_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        self._lock = threading.Lock()
+        self._worker = _Worker()
+        self._stuck = None          # (name, future) of a timed-out call the terminal has not returned from
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._last_error = None
+        self._stats = {}
+
+    # Circuit breaker state: "closed" (normal), "open" (rejecting) or "half-open" (one trial call)
+    @property
+    def state(self):
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def _stats_for(self, name):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = CallStats()
+        return stats
+
+    def _on_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logging.info("MT5 circuit closed after successful trial call")
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._last_error = None
+
+    def _on_failure(self, name, reason):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._last_error = (name, reason)
+            if self._opened_at is not None or self._consecutive_failures >= self.failure_threshold:
+                # (Re)open on threshold, or on a failed half-open trial call
+                self._opened_at = time.monotonic()
+                logging.error(f"MT5 circuit open after {self._consecutive_failures} failures (last: {name} {reason})")
+
+    def submit(self, name, *args, timeout=None, **kwargs):
+        """
+        Queue mt5.<name>(*args, **kwargs) on the worker without waiting for it.
+        Returns (future, timeout), or None when the call is rejected (worker
+        stuck, circuit open). The caller waits on the future itself and hands
+        it to settle(), so stats and the circuit breaker see the outcome.
+        """
+        func = getattr(self._mt5, name)
+        with self._lock:
+            stats = self._stats_for(name)
+            if self._stuck is not None and self._stuck[1].done():
+                logging.info(f"MT5 {self._stuck[0]} returned after timing out; worker free again")
+                self._stuck = None
+            if self._stuck is not None:
+                # The terminal API is not thread-safe: never run a call next to the stuck one
+                stats.rejected += 1
+                self._last_error = (name, f"worker busy with timed-out {self._stuck[0]}")
+                return None
+            if self._state_locked() == "open":
+                stats.rejected += 1
+                self._last_error = (name, "circuit open")
+                return None
+
+        if timeout is None:
+            timeout = self.timeouts.get(name, DEFAULT_TIMEOUT)
+        return self._worker.submit(func, *args, **kwargs), timeout
+
+    def settle(self, name, future, started, timed_out_after=None):
+        """Record a submitted call's outcome; returns its result, or None if it timed out or raised."""
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        with self._lock:
+            stats = self._stats_for(name)
+            stats.record(elapsed_ms)
+            if timed_out_after is not None:
+                stats.timeouts += 1
+                # The worker is stuck inside the terminal call; later calls are rejected
+                # (not queued, not run on another thread) until it returns
+                self._stuck = (name, future)
+            elif future.exception() is not None:
+                stats.failures += 1
+        if timed_out_after is not None:
+            self._on_failure(name, f"timed out after {timed_out_after:.1f}s")
+            return None
+        if future.exception() is not None:
+            self._on_failure(name, repr(future.exception()))
+            return None
+        self._on_success()
+        return future.result()
+
+    def call(self, name, *args, timeout=None, **kwargs):
+        """Run mt5.<name>(*args, **kwargs) on the worker thread, bounded by a timeout."""
+        if name in INLINE_CALLS:
+            return getattr(self._mt5, name)(*args, **kwargs)
+
+        started = time.perf_counter()
+        submitted = self.submit(name, *args, timeout=timeout, **kwargs)
+        if submitted is None:
+            return None
+        future, timeout = submitted
+        timed_out_after = None
+        try:
+            future.result(timeout=timeout)
+        except FutureTimeout:
+            if name in NO_ABANDON_CALLS:
+                logging.warning(f"MT5 {name} still running after {timeout:.1f}s; waiting for its result")
+                wait([future])
+            else:
+                timed_out_after = timeout
+        except Exception:
+            pass   # Reported by settle()
+        return self.settle(name, future, started, timed_out_after)
+
+    def last_error(self):
+        """Guard-level error if the last failure was a timeout/rejection, else the terminal's."""
+        with self._lock:
+            guard_error = self._last_error
+        if guard_error is not None:
+            return guard_error
+        return self._mt5.last_error()
+
+    def clear_error(self):
+        with self._lock:
+            self._last_error = None
+
+    def stats(self):
+        """Per-function latency statistics, e.g. {'positions_get': {'calls': 10, 'p95_ms': 4.1, ...}}."""
+        with self._lock:
+            return {name: s.as_dict() for name, s in self._stats.items()}
+
+    def log_stats(self):
+        for name, s in sorted(self.stats().items()):
+            logging.info(f"MT5 {name}: {s}")
+
+    def close(self):
+        self._worker.shutdown()
+
+    def __getattr__(self, name):
+        if name == "_mt5":
+            raise AttributeError(name)
+        attr = getattr(self._mt5, name)
+        if not callable(attr):
+            return attr  # constants such as TIMEFRAME_M1, TRADE_RETCODE_DONE
+        def guarded(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        guarded.__name__ = name
+        return guarded
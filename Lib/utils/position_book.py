@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_STATE_PATH = os.path.join(ROOT, "json", "original_atr.json")
+RESYNC_SECONDS = 60
+DEAL_OVERLAP = 60   # seconds re-scanned behind the newest seen deal
+# Deal times are broker server time (usually UTC+2/+3), not local time, so the
+# local clock is only trusted to within a day either way (as DealStore does)
+SERVER_SKEW = 24 * 3600
+
+
+class PositionRecord:
+    """One open position as the trailer needs it, plus its persisted trail state."""
+
+    __slots__ = ("ticket", "symbol", "type", "volume", "entry", "sl", "tp", "original_atr", "trail_tier")
+
+    def __init__(self, ticket, symbol, type, volume, entry, sl, tp, original_atr=None, trail_tier=0):
+        self.ticket = ticket
+        self.symbol = symbol
+        self.type = type
+        self.volume = volume
+        self.entry = entry
+        self.sl = sl
+        self.tp = tp
+        self.original_atr = original_atr
+        self.trail_tier = trail_tier
+
+    @classmethod
+    def from_position(cls, position, state=None):
+        state = state or {}
+        return cls(position.ticket, position.symbol, position.type, position.volume, position.price_open,
+                   position.sl, position.tp, state.get("original_atr"), state.get("trail_tier", 0))
+
+    def __repr__(self):
+        return (f"PositionRecord({self.ticket} {self.symbol} type={self.type} vol={self.volume} "
+                f"entry={self.entry} sl={self.sl} atr={self.original_atr} tier={self.trail_tier})")
+
+
+class PositionBook:
+    """
+    Open positions kept in memory and updated from deltas.
+
+    refresh() normally costs a positions_total() and a history_deals_total()
+    over a short window behind the newest deal seen (in server time, which the
+    window's local-clock end is padded to cover). Only when that deal count
+    moves are the new deals fetched, and only the positions they touch are
+    re-read with positions_get(ticket=...), so the work per cycle follows the
+    number of changes rather than the number of open positions. A mismatch
+    between positions_total() and the book, or RESYNC_SECONDS since the last
+    full positions_get(), triggers a full resync, which also picks up SL/TP
+    edits made outside this process (they produce no deal).
+
+    Each ticket's original ATR and trail tier are persisted in
+    json/original_atr.json (older files holding bare ATR values still load)
+    and dropped once the position is gone.
+    """
+
+    def __init__(self, mt5_api, state_path=DEFAULT_STATE_PATH, resync_seconds=RESYNC_SECONDS):
+        self._mt5 = mt5_api
+        self.state_path = state_path
+        self.resync_seconds = resync_seconds
+        self._lock = threading.Lock()
+        self.records = {}
+        self._state = self._load_state()
+        self._last_resync = None
+        self._deal_from = int(time.time()) - SERVER_SKEW
+        self._deal_count = None
+        self._last_deal = 0
+        self.resyncs = 0
+        self.delta_updates = 0
+
+    # Persisted trail state ----------------------------------------------
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                raw = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {int(ticket): value if isinstance(value, dict) else {"original_atr": value, "trail_tier": 0}
+                for ticket, value in raw.items()}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({str(ticket): state for ticket, state in self._state.items()}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _remember(self, record):
+        state = {"original_atr": record.original_atr, "trail_tier": record.trail_tier}
+        if self._state.get(record.ticket) != state:
+            self._state[record.ticket] = state
+            self._save_state()
+
+    def set_original_atr(self, ticket, original_atr):
+        with self._lock:
+            record = self.records.get(ticket)
+            if record is not None:
+                record.original_atr = original_atr
+                self._remember(record)
+
+    def set_trail_tier(self, ticket, tier):
+        with self._lock:
+            record = self.records.get(ticket)
+            if record is not None and record.trail_tier != tier:
+                record.trail_tier = tier
+                self._remember(record)
+
+    def update_sl(self, ticket, sl):
+        """Record an SL this process just set, so the next cycle doesn't need a re-read."""
+        with self._lock:
+            record = self.records.get(ticket)
+            if record is not None:
+                record.sl = sl
+
+    # Terminal sync -------------------------------------------------------
+
+    def resync(self):
+        """Rebuild the book from one positions_get(). False if the terminal call failed."""
+        positions = self._mt5.positions_get()
+        if positions is None:
+            logging.error(f"Failed to get positions: {self._mt5.last_error()}")
+            return False
+        with self._lock:
+            self.records = {p.ticket: PositionRecord.from_position(p, self._state.get(p.ticket)) for p in positions}
+            # Forget trail state of positions that are gone
+            stale = [ticket for ticket in self._state if ticket not in self.records]
+            for ticket in stale:
+                del self._state[ticket]
+            if stale:
+                self._save_state()
+            self._last_resync = time.monotonic()
+            self.resyncs += 1
+        return True
+
+    def reload(self, ticket):
+        """Re-read one position from the terminal; returns its record, or None once it is closed."""
+        positions = self._mt5.positions_get(ticket=ticket)
+        if positions is None:
+            return self.records.get(ticket)
+        with self._lock:
+            if len(positions) == 0:
+                self.records.pop(ticket, None)
+                if self._state.pop(ticket, None) is not None:
+                    self._save_state()
+                return None
+            record = PositionRecord.from_position(positions[0], self._state.get(ticket))
+            self.records[ticket] = record
+            return record
+
+    def _new_deals(self):
+        to_ts = max(int(time.time()), self._deal_from) + SERVER_SKEW
+        count = self._mt5.history_deals_total(self._deal_from, to_ts)
+        if count is None or count == self._deal_count:
+            return []
+        deals = self._mt5.history_deals_get(self._deal_from, to_ts)
+        if deals is None:
+            return []
+        new = [d for d in deals if d.ticket > self._last_deal]
+        if new:
+            self._last_deal = max(d.ticket for d in new)
+            # Slide the window up to the newest deal (server time) so the count stays small
+            self._deal_from = max(self._deal_from, max(d.time for d in new) - DEAL_OVERLAP)
+            count = sum(1 for d in deals if d.time >= self._deal_from)
+        self._deal_count = count
+        return new
+
+    def refresh(self):
+        """Bring the book up to date; False when a needed full resync failed."""
+        if self._last_resync is None or time.monotonic() - self._last_resync >= self.resync_seconds:
+            if self._last_resync is None:
+                self._new_deals()   # Everything before the first resync is already in it
+            return self.resync()
+        for position_id in {d.position_id for d in self._new_deals() if d.position_id}:
+            self.reload(position_id)
+            self.delta_updates += 1
+        total = self._mt5.positions_total()
+        if total is not None and total != len(self.records):
+            return self.resync()
+        return True
+
+    def positions(self):
+        with self._lock:
+            return list(self.records.values())
+
+    def stats(self):
+        return {"positions": len(self.records), "resyncs": self.resyncs, "delta_updates": self.delta_updates}
@@ -0,0 +1,166 @@
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from multiprocessing import resource_tracker, shared_memory
+
+BOARD_NAME = "freestyler_regime_board"
+BOARD_SYMBOLS = ("XAUUSD", "XAUEUR")
+MAGIC = b"RGB1"
+
+# Header: magic, slot count
+HEADER = struct.Struct("<4sI")
+# Each slot: symbol name, then a choppy and a ranging section. Every section
+# starts with its own sequence counter and has exactly one writer process.
+NAME = struct.Struct("<16s")
+CHOPPY = struct.Struct("<Qbdd")          # seq, condition, avg_atr_points, updated_at
+RANGING = struct.Struct("<Qbbbdqd")      # seq, status, is_marabozu, candle_type, midpoint, bar_time, updated_at
+SLOT_SIZE = NAME.size + CHOPPY.size + RANGING.size
+
+CONDITIONS = ["Unknown", "Choppy", "Trending/Volatile", "Insufficient Data", "Data Fetch Error"]
+STATUSES = ["Unknown", "Ranging", "Trending"]
+CANDLE_TYPES = ["Unknown", "Bullish", "Bearish", "Neutral"]
+
+READ_RETRIES = 100
+
+
+def board_symbols():
+    names = os.getenv("REGIME_BOARD_SYMBOLS")
+    return tuple(s.strip() for s in names.split(",") if s.strip()) if names else BOARD_SYMBOLS
+
+
+class RegimeBoard:
+    """
+    Fixed-layout regime board in shared memory, replacing the choppy/ranging
+    JSON files as the channel between the detectors and final.py.
+
+    Slots are assigned from a fixed symbol list (REGIME_BOARD_SYMBOLS, same in
+    every process), so no process ever has to claim a slot. Each section is a
+    seqlock: the single writer makes the counter odd, writes the fields and
+    makes it even again; readers retry until they see the same even counter
+    before and after copying, so a snapshot is never torn and no lock is taken.
+
+    The board lives as long as some process has it open (on Windows the
+    segment goes away with its last handle), so readers fall back to the JSON
+    files when a section has never been written.
+    """
+
+    def __init__(self, name=BOARD_NAME, symbols=None):
+        self.symbols = tuple(symbols or board_symbols())
+        self._slots = {symbol: i for i, symbol in enumerate(self.symbols)}
+        size = HEADER.size + SLOT_SIZE * len(self.symbols)
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            created = True
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=name)
+            created = False
+        if os.name == "posix":
+            # Keep the segment when this process exits; other processes may still read it
+            try:
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+            except Exception:
+                pass
+        self._buf = self._shm.buf
+        if created:
+            HEADER.pack_into(self._buf, 0, MAGIC, len(self.symbols))
+            for symbol, slot in self._slots.items():
+                NAME.pack_into(self._buf, self._slot_offset(slot), symbol.encode())
+        else:
+            magic, count = HEADER.unpack_from(self._buf, 0)
+            for _ in range(10):
+                if magic != bytes(4):
+                    break
+                time.sleep(0.05)  # creator has not written the header yet
+                magic, count = HEADER.unpack_from(self._buf, 0)
+            if magic != MAGIC or count != len(self.symbols) or self._shm.size < size:
+                raise ValueError(f"Regime board {name} has an incompatible layout")
+
+    def _slot_offset(self, slot):
+        return HEADER.size + slot * SLOT_SIZE
+
+    def _section_offset(self, symbol, section):
+        slot = self._slots.get(symbol)
+        if slot is None:
+            return None
+        offset = self._slot_offset(slot) + NAME.size
+        return offset if section == "choppy" else offset + CHOPPY.size
+
+    def _write(self, layout, offset, *fields):
+        seq = struct.unpack_from("<Q", self._buf, offset)[0]
+        struct.pack_into("<Q", self._buf, offset, seq + 1)    # odd: write in progress
+        layout.pack_into(self._buf, offset, seq + 1, *fields)
+        struct.pack_into("<Q", self._buf, offset, seq + 2)    # even: consistent
+
+    def _read(self, layout, offset):
+        for _ in range(READ_RETRIES):
+            seq_before = struct.unpack_from("<Q", self._buf, offset)[0]
+            if seq_before % 2:
+                continue
+            values = layout.unpack_from(self._buf, offset)
+            if struct.unpack_from("<Q", self._buf, offset)[0] == seq_before:
+                return values
+        return None
+
+    # Writers -------------------------------------------------------------
+
+    def publish_choppy(self, symbol, market_condition, avg_atr_points):
+        offset = self._section_offset(symbol, "choppy")
+        if offset is None:
+            return False
+        condition = CONDITIONS.index(market_condition) if market_condition in CONDITIONS else 0
+        self._write(CHOPPY, offset, condition, float(avg_atr_points), time.time())
+        return True
+
+    def publish_ranging(self, symbol, market_status, midpoint, is_marabozu, candle_type, bar_time):
+        offset = self._section_offset(symbol, "ranging")
+        if offset is None:
+            return False
+        status = STATUSES.index(market_status) if market_status in STATUSES else 0
+        candle = CANDLE_TYPES.index(candle_type) if candle_type in CANDLE_TYPES else 0
+        self._write(RANGING, offset, status, int(bool(is_marabozu)), candle, float(midpoint), int(bar_time), time.time())
+        return True
+
+    # Readers -------------------------------------------------------------
+
+    def read_choppy(self, symbol, max_age=None):
+        """Latest choppy state as a dict, or None if never written, stale or unreadable."""
+        offset = self._section_offset(symbol, "choppy")
+        values = self._read(CHOPPY, offset) if offset is not None else None
+        if values is None or values[0] == 0:
+            return None
+        _, condition, avg_atr_points, updated_at = values
+        if max_age is not None and time.time() - updated_at > max_age:
+            return None
+        market_condition = CONDITIONS[condition]
+        return {"is_choppy": market_condition == "Choppy", "market_condition": market_condition,
+                "avg_atr_points": avg_atr_points, "updated_at": updated_at}
+
+    def read_ranging(self, symbol, max_age=None):
+        """Latest ranging state in the ranging_market JSON layout, or None."""
+        offset = self._section_offset(symbol, "ranging")
+        values = self._read(RANGING, offset) if offset is not None else None
+        if values is None or values[0] == 0:
+            return None
+        _, status, is_marabozu, candle, midpoint, bar_time, updated_at = values
+        if max_age is not None and time.time() - updated_at > max_age:
+            return None
+        market_status = STATUSES[status]
+        return {"pair": symbol, "market_status": market_status, "midpoint": midpoint,
+                "is_trending": market_status == "Trending",
+                "candle_time": datetime.fromtimestamp(bar_time, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+                "is_marabozu": bool(is_marabozu), "candle_type": CANDLE_TYPES[candle],
+                "updated_at": updated_at}
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+
+
+def open_board(name=BOARD_NAME, symbols=None):
+    """Open (or create) the board; None when shared memory is unavailable, so callers use JSON."""
+    try:
+        return RegimeBoard(name, symbols)
+    except (OSError, ValueError) as e:
+        print(f"Regime board unavailable ({e}), using JSON files.")
+        return None
@@ -0,0 +1,192 @@
+import math
+
+import numpy as np
+
+
+# Symbol classes used throughout the grid: gold, yen crosses and everything else
+def is_xau(symbol):
+    return 'XAU' in symbol
+
+
+def is_jpy(symbol):
+    return 'JPY' in symbol
+
+
+def increment_for(symbol):
+    """Distance between major points (MP1 -> MP2)."""
+    return 100 if is_xau(symbol) else 10 if is_jpy(symbol) else 0.1
+
+
+def level_step(symbol):
+    """Spacing between consecutive shoot levels (MP, QHP, QP, HP, ...), an eighth of the increment."""
+    return 12.5 if is_xau(symbol) else 1.25 if is_jpy(symbol) else 0.0125
+
+
+def symbol_digits(symbol):
+    """Quote digits of the symbol classes above: 2 for gold, 3 for yen crosses, 5 otherwise."""
+    return 2 if is_xau(symbol) else 3 if is_jpy(symbol) else 5
+
+
+def shoot_offset(symbol):
+    """Overshoot/undershoot distance either side of a level."""
+    return 2.5 if is_xau(symbol) else 0.25 if is_jpy(symbol) else 0.0025
+
+
+# Generic grids are sized in points, so they fit any symbol. For the legacy
+# classes these reproduce the hard-coded values: XAU (point 0.01) 100/2.5,
+# JPY (0.001) 10/0.25, 5-digit FX (0.00001) 0.1/0.0025.
+INCREMENT_POINTS = 10000   # MP1 -> MP2
+OFFSET_POINTS = 250        # overshoot/undershoot either side of a level
+LIMIT_POINTS = 60          # Upper/Lower Limit padding beyond the overshoot/undershoot
+LEGACY_DEPTH = 3           # increment halved three times: MP, HP, QP, QHP -> 17 levels MP3..MP2
+
+
+def level_resolutions(depth, span=1):
+    """
+    Coarsest resolution each grid level belongs to: 0 for major points, 1 for
+    halves, 2 for quarters, ... up to depth. For depth 3 that is
+    [0, 3, 2, 3, 1, 3, 2, 3, 0, ...] (MP, QHP, QP, QHP, HP, ...).
+    """
+    k = np.arange(2 * span * 2 ** depth + 1)
+    lowest_bit = k & -k
+    finer = np.where(k % 2 ** depth == 0, 0, depth - np.log2(np.maximum(lowest_bit, 1)).astype(int))
+    return finer.astype(int)
+
+
+def grid_levels(anchor, increment, depth=LEGACY_DEPTH, span=1, offset=0.0, padding=0.0, decimals=4):
+    """
+    Vectorized multi-resolution grid around one or many anchors.
+
+    Levels run from anchor - span * increment to anchor + span * increment in
+    steps of increment / 2**depth (2 * span * 2**depth + 1 levels). anchor,
+    increment, offset and padding broadcast against each other along the
+    leading axis, so a backtest can evaluate thousands of grid variants in one
+    call; depth and span are shared by the call. Returns (variants x levels)
+    arrays for levels, overshoot/undershoot (level +/- offset) and upper/lower
+    limits (overshoot + padding, undershoot - padding), plus the per-level
+    resolution from level_resolutions().
+    """
+    anchor, increment, offset, padding = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=float)) for v in (anchor, increment, offset, padding)))
+    steps = np.arange(-span * 2 ** depth, span * 2 ** depth + 1)
+    levels = np.round(anchor[:, None] + (increment / 2 ** depth)[:, None] * steps, decimals)
+    overshoot = np.round(levels + offset[:, None], decimals)
+    undershoot = np.round(levels - offset[:, None], decimals)
+    return {
+        "levels": levels,
+        "resolution": level_resolutions(depth, span),
+        "overshoot": overshoot,
+        "undershoot": undershoot,
+        "upper": overshoot + padding[:, None],
+        "lower": undershoot - padding[:, None],
+    }
+
+
+def symbol_grid(prices, point, digits, depth=LEGACY_DEPTH, span=1,
+                increment_points=INCREMENT_POINTS, offset_points=OFFSET_POINTS, limit_points=LIMIT_POINTS):
+    """
+    Grid for any symbol from its symbol_info point/digits, anchored on the
+    price rounded to the nearest increment. Levels are kept to digits + 2
+    decimals, which holds every subdivision up to depth 6 exactly.
+    """
+    increment = increment_points * point
+    prices = np.atleast_1d(np.asarray(prices, dtype=float))
+    anchor = np.round(prices / increment) * increment
+    grid = grid_levels(anchor, increment, depth, span, offset_points * point, limit_points * point, digits + 2)
+    grid["anchor"] = anchor
+    return grid
+
+
+def major_points(symbols, prices):
+    """Legacy MP1/MP2/MP3 arrays for parallel symbol/price arrays: XAU rounds to 100, JPY floors to 10, others round to 0.1."""
+    prices = np.asarray(prices, dtype=float)
+    xau = np.array([is_xau(s) for s in symbols], dtype=bool)
+    jpy = np.array([is_jpy(s) for s in symbols], dtype=bool)
+    increment = np.array([increment_for(s) for s in symbols], dtype=float)
+    # Python's round() for the one-decimal case: np.round differs on ties such as 1.05
+    nearest_tenth = np.array([round(float(p), 1) for p in prices])
+    mp1 = np.where(xau, np.round(prices / 100) * 100, np.where(jpy, np.floor(prices / 10) * 10, nearest_tenth))
+    return mp1, np.round(mp1 + increment, 1), np.round(mp1 - increment, 1)
+
+
+def shoot_grid(symbols, prices, points):
+    """
+    The legacy 17-zone shoot grid (MP3, QHP, QP, QHP, HP, ..., MP2) for
+    several symbols in one pass: grid_levels() at depth 3 around the legacy
+    MP1, with the per-class increment/offset, LIMIT_POINTS padding and levels
+    rounded to 4 decimals.
+    """
+    mp1, mp2, mp3 = major_points(symbols, prices)
+    grid = grid_levels(
+        mp1,
+        [increment_for(s) for s in symbols],
+        depth=LEGACY_DEPTH,
+        offset=[shoot_offset(s) for s in symbols],
+        padding=LIMIT_POINTS * np.asarray(points, dtype=float),
+        decimals=4,
+    )
+    grid.update({"MP1": mp1, "MP2": mp2, "MP3": mp3})
+    return grid
+
+
+def zones(grid, row):
+    """One symbol's row of shoot_grid() in the shoot_values.pkl layout ({"zone1": {...}, ...})."""
+    return {
+        f"zone{i + 1}": {
+            "Overshoot": float(grid["overshoot"][row, i]),
+            "Undershoot": float(grid["undershoot"][row, i]),
+            "Upper Limit": float(grid["upper"][row, i]),
+            "Lower Limit": float(grid["lower"][row, i]),
+        }
+        for i in range(grid["levels"].shape[1])
+    }
+
+
+def trade_band_edges(symbol, low, high):
+    """
+    B/T band edges covering [low, high] on the symbol's shoot grid.
+
+    Between two consecutive levels L and L + s the bottom band is
+    [L + s/4, L + s/2) and the top band [L + s/2, L + 3s/4); the rest of the
+    cell (around each level) is outside any band. Returns a sorted edge array
+    where edge i starts a B band when i % 3 == 0, a T band when i % 3 == 1 and
+    an uncovered gap when i % 3 == 2. Edges are left unrounded (FX edges such
+    as 1.078125 need more decimals than the quote); only labels are rounded.
+    """
+    step = level_step(symbol)
+    first = math.floor(low / step) - 1
+    last = math.ceil(high / step) + 1
+    levels = np.arange(first, last + 1) * step
+    edges = levels[:, None] + step * np.array([0.25, 0.5, 0.75])
+    return edges.ravel()
+
+
+def classify_trade_ranges(symbols, prices):
+    """
+    Vectorized replacement for the hard-coded (lower, upper, tag) scan in the reports.
+
+    Returns labels such as "B 3203.125-3206.25", "T 3206.25-3209.375" or
+    "Outside Defined Ranges", one per (symbol, price), valid at any price level.
+    """
+    symbols = np.asarray(symbols, dtype=object)
+    prices = np.asarray(prices, dtype=float)
+    labels = np.full(len(prices), "Outside Defined Ranges", dtype=object)
+    for symbol in np.unique(symbols):
+        mask = (symbols == symbol) & ~np.isnan(prices)
+        if not mask.any():
+            continue
+        sym_prices = prices[mask]
+        edges = trade_band_edges(symbol, sym_prices.min(), sym_prices.max())
+        # Label text to the symbol's digits + 2, like symbol_grid() levels
+        text = [str(round(float(edge), symbol_digits(symbol) + 2)) for edge in edges]
+        band_labels = np.array(
+            [f"B {text[i]}-{text[i + 1]}" if i % 3 == 0 else f"T {text[i]}-{text[i + 1]}" if i % 3 == 1 else "Outside Defined Ranges"
+             for i in range(len(edges) - 1)] + ["Outside Defined Ranges"],
+            dtype=object,
+        )
+        idx = np.searchsorted(edges, sym_prices, side='right') - 1
+        sym_labels = np.full(len(sym_prices), "Outside Defined Ranges", dtype=object)
+        inside = idx >= 0
+        sym_labels[inside] = band_labels[idx[inside]]
+        labels[mask] = sym_labels
+    return labels
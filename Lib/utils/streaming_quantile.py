@@ -0,0 +1,137 @@
+import math
+
+
+class P2Quantile:
+    """
+    P-square streaming estimate of one quantile (Jain & Chlamtac, 1985).
+
+    Five markers track the minimum, p/2, p, (1+p)/2 quantiles and the maximum;
+    each update is O(1) and the state is five heights and positions, so it can
+    run over months of bars and be saved with to_dict()/from_dict().
+    """
+
+    def __init__(self, p):
+        if not 0 < p < 1:
+            raise ValueError("p must be between 0 and 1")
+        self.p = p
+        self.n = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, x):
+        x = float(x)
+        if math.isnan(x):
+            return
+        self.n += 1
+        if self.n <= 5:
+            self.heights.append(x)
+            self.heights.sort()
+            return
+
+        q = self.heights
+        # Cell the observation falls in, widening the extremes if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the three middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - self.positions[i]
+            if (d >= 1 and self.positions[i + 1] - self.positions[i] > 1) or \
+                    (d <= -1 and self.positions[i - 1] - self.positions[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = self._parabolic(i, step)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = self._linear(i, step)
+                q[i] = candidate
+                self.positions[i] += step
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _linear(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+    def value(self):
+        """Current estimate, or None before any observation."""
+        if self.n == 0:
+            return None
+        if self.n <= 5:
+            # Exact quantile of the few values seen so far
+            return self.heights[min(len(self.heights) - 1, int(round(self.p * (len(self.heights) - 1))))]
+        return self.heights[2]
+
+    def to_dict(self):
+        return {"p": self.p, "n": self.n, "heights": self.heights,
+                "positions": self.positions, "desired": self.desired}
+
+    @classmethod
+    def from_dict(cls, state):
+        estimator = cls(state["p"])
+        estimator.n = state["n"]
+        estimator.heights = list(state["heights"])
+        estimator.positions = list(state["positions"])
+        estimator.desired = list(state["desired"])
+        return estimator
+
+
+class RollingQuantile:
+    """
+    Quantile of roughly the last span to 2 * span observations.
+
+    A plain P2Quantile is cumulative, so after months of data it hardly moves
+    when the distribution shifts. Here a fresh estimator is started every span
+    observations and fed alongside the active one; once it has seen span
+    observations it replaces the active one. The estimate therefore always
+    covers recent data only, at the cost of at most two P2Quantile updates per
+    observation.
+    """
+
+    def __init__(self, p, span, estimators=None):
+        self.p = p
+        self.span = span
+        self.estimators = estimators or [P2Quantile(p)]
+
+    @property
+    def n(self):
+        """Observations behind the current estimate."""
+        return self.estimators[0].n
+
+    def update(self, x):
+        for estimator in self.estimators:
+            estimator.update(x)
+        if len(self.estimators) > 1 and self.estimators[1].n >= self.span:
+            self.estimators.pop(0)
+        if self.estimators[-1].n >= self.span:
+            self.estimators.append(P2Quantile(self.p))
+
+    def value(self):
+        return self.estimators[0].value()
+
+    def to_dict(self):
+        return {"p": self.p, "span": self.span, "estimators": [e.to_dict() for e in self.estimators]}
+
+    @classmethod
+    def from_dict(cls, state, span=None):
+        """Restore a saved RollingQuantile; a saved cumulative P2Quantile becomes its active estimator."""
+        if "estimators" not in state:
+            return cls(state["p"], span, [P2Quantile.from_dict(state)])
+        return cls(state["p"], span or state["span"], [P2Quantile.from_dict(e) for e in state["estimators"]])
@@ -0,0 +1,89 @@
+import threading
+import time
+
+# Symbol specs (point, digits, visible, ...) do not change intraday; ticks go stale fast
+SPEC_TTL = 3600.0
+TICK_TTL = 0.25
+SYMBOLS_TTL = 3600.0
+
+
+class SymbolCache:
+    """
+    TTL cache in front of mt5.symbol_info, mt5.symbol_info_tick and mt5.symbols_get.
+
+    Failed lookups (None) are never cached. Call invalidate() after a
+    (re)connect so specs are re-read from the new session, and
+    invalidate(symbol) after symbol_select() changes a symbol's visibility.
+    """
+
+    def __init__(self, mt5_api, spec_ttl=SPEC_TTL, tick_ttl=TICK_TTL, symbols_ttl=SYMBOLS_TTL):
+        self._mt5 = mt5_api
+        self.spec_ttl = spec_ttl
+        self.tick_ttl = tick_ttl
+        self.symbols_ttl = symbols_ttl
+        self._lock = threading.Lock()
+        self._specs = {}
+        self._ticks = {}
+        self._symbols = None
+        self._names = frozenset()
+        self.hits = {"symbol_info": 0, "symbol_info_tick": 0, "symbols_get": 0}
+        self.misses = {"symbol_info": 0, "symbol_info_tick": 0, "symbols_get": 0}
+
+    def _lookup(self, kind, store, key, ttl, fetch):
+        now = time.monotonic()
+        with self._lock:
+            entry = store.get(key)
+            if entry is not None and now - entry[0] < ttl:
+                self.hits[kind] += 1
+                return entry[1]
+            self.misses[kind] += 1
+        value = fetch()
+        if value is not None:
+            with self._lock:
+                store[key] = (time.monotonic(), value)
+        return value
+
+    def symbol_info(self, symbol):
+        return self._lookup("symbol_info", self._specs, symbol, self.spec_ttl,
+                            lambda: self._mt5.symbol_info(symbol))
+
+    def symbol_info_tick(self, symbol, max_age=None):
+        """Latest tick; pass max_age=0 to force a fresh read (e.g. for an order price)."""
+        ttl = self.tick_ttl if max_age is None else max_age
+        return self._lookup("symbol_info_tick", self._ticks, symbol, ttl,
+                            lambda: self._mt5.symbol_info_tick(symbol))
+
+    def symbols_get(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._symbols is not None and now - self._symbols[0] < self.symbols_ttl:
+                self.hits["symbols_get"] += 1
+                return self._symbols[1]
+            self.misses["symbols_get"] += 1
+        symbols = self._mt5.symbols_get()
+        if symbols is not None:
+            with self._lock:
+                self._symbols = (time.monotonic(), symbols)
+                self._names = frozenset(s.name for s in symbols)
+        return symbols
+
+    def symbol_names(self):
+        """Set of broker symbol names, for O(1) membership checks."""
+        self.symbols_get()
+        with self._lock:
+            return self._names
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._specs.clear()
+                self._ticks.clear()
+                self._symbols = None
+                self._names = frozenset()
+            else:
+                self._specs.pop(symbol, None)
+                self._ticks.pop(symbol, None)
+
+    def stats(self):
+        with self._lock:
+            return {kind: {"hits": self.hits[kind], "misses": self.misses[kind]} for kind in self.hits}
@@ -0,0 +1,167 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MINUTES_PER_DAY = 1440
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+OPEN = b"\x01"
+CLOSED = b"\x00"
+NO_RANGE = 255
+MAX_LOOKAHEAD_DAYS = 14
+
+
+class TradingCalendar:
+    """
+    Weekly trading ranges compiled into a minute-of-week bitmap, overlaid with
+    the per-date schedule from trading_schedule.json.
+
+    Minute m of the week (Monday 00:00 = 0) is open when it falls inside one of
+    the day's (start, end) ranges on a weekday; a range covers its start
+    minute up to but not including its end minute. check_time() and
+    check_day() are O(1) lookups returning the same (allowed, message) pairs
+    as the original gate functions. next_open()/next_close() scan the bitmap
+    with bytes.find, skipping dates the schedule does not mark as trading days.
+    The schedule file is re-read only when its mtime changes.
+    """
+
+    def __init__(self, trading_ranges, schedule_path, timezone):
+        self.timezone = timezone
+        self.schedule_path = schedule_path
+        self._ranges = {day: list(ranges) for day, ranges in trading_ranges.items()}
+        bitmap = bytearray(MINUTES_PER_WEEK)
+        self._range_of = bytearray([NO_RANGE]) * MINUTES_PER_WEEK  # index of the covering range, for messages
+        for day_index, day_name in enumerate(DAY_NAMES[:5]):
+            for range_index, (start, end) in enumerate(self._ranges.get(day_name, [])):
+                first = day_index * MINUTES_PER_DAY + start.hour * 60 + start.minute
+                last = day_index * MINUTES_PER_DAY + end.hour * 60 + end.minute
+                bitmap[first:last] = OPEN * (last - first)
+                self._range_of[first:last] = bytes([range_index]) * (last - first)
+        self._bitmap = bytes(bitmap)
+        self._schedule_mtime = None
+        self._schedule = None
+        self._schedule_error = None
+
+    # Schedule (dates) ----------------------------------------------------
+
+    def _load_schedule(self):
+        try:
+            mtime = os.path.getmtime(self.schedule_path)
+        except OSError as e:
+            self._schedule_mtime, self._schedule = None, None
+            self._schedule_error = ("JSON load error", f"Error: Could not load {self.schedule_path} ({str(e)}). Pausing trading.")
+            return
+        if mtime == self._schedule_mtime:
+            return
+        self._schedule_mtime = mtime
+        self._schedule, self._schedule_error = None, None
+        try:
+            with open(self.schedule_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self._schedule_error = ("JSON load error", f"Error: Could not load {self.schedule_path} ({str(e)}). Pausing trading.")
+            return
+        if 'schedule' not in data or 'start_date' not in data or 'end_date' not in data:
+            self._schedule_error = ("Invalid JSON", f"Error: Invalid JSON format in {self.schedule_path}. Pausing trading.")
+            return
+        self._schedule = {
+            "start_date": datetime.strptime(data['start_date'], '%Y-%m-%d').date(),
+            "end_date": datetime.strptime(data['end_date'], '%Y-%m-%d').date(),
+            "days": dict(data['schedule']),
+            "trading_dates": frozenset(d for d, status in data['schedule'].items() if status == "Trading Day"),
+        }
+
+    def check_day(self, now=None):
+        """(allowed, message) for today's date against trading_schedule.json."""
+        now = now or datetime.now(self.timezone)
+        self._load_schedule()
+        if self._schedule is None:
+            message, detail = self._schedule_error
+            print(detail)
+            return False, message
+        today = now.date().strftime('%Y-%m-%d')
+        start_date, end_date = self._schedule["start_date"], self._schedule["end_date"]
+        if today < start_date.strftime('%Y-%m-%d') or today > end_date.strftime('%Y-%m-%d'):
+            print(f"Error: Today ({today}) is outside JSON date range ({start_date} to {end_date}). Pausing trading.")
+            return False, "Outside date range"
+        if today not in self._schedule["days"]:
+            print(f"Error: Today ({today}) not found in schedule. Pausing trading.")
+            return False, "Date not found"
+        status = self._schedule["days"][today]
+        if status == "Trading Day":
+            return True, f"✅ Today ({today}) is a Trading Day. Trading allowed."
+        return False, f"🚫 Today is {status}, no trading."
+
+    # Weekly ranges (minute of week) ---------------------------------------
+
+    @staticmethod
+    def minute_of_week(now):
+        return now.weekday() * MINUTES_PER_DAY + now.hour * 60 + now.minute
+
+    def check_time(self, now=None):
+        """(allowed, message) for the current time against the weekly ranges."""
+        now = now or datetime.now(self.timezone)
+        day_name = DAY_NAMES[now.weekday()]
+        if now.weekday() >= 5:
+            return False, f"🚫 NOT A WEEKDAY: No trading on {day_name}."
+        if not self._ranges.get(day_name):
+            return False, f"🚫 NO TRADING RANGES DEFINED for {day_name}."
+        minute = self.minute_of_week(now)
+        current_time = now.time()
+        if self._bitmap[minute]:
+            start, end = self._ranges[day_name][self._range_of[minute]]
+            return True, f"✅ TRADING ALLOWED: {day_name} {current_time.strftime('%H:%M:%S')} within {start.strftime('%H:%M')}-{end.strftime('%H:%M')}"
+        return False, f"🚫 NOT TRADING TIME: {day_name} {current_time.strftime('%H:%M:%S')} outside defined ranges."
+
+    def is_open(self, now=None):
+        now = now or datetime.now(self.timezone)
+        self._load_schedule()
+        return bool(self._bitmap[self.minute_of_week(now)]) and self._is_trading_date(now.date())
+
+    def _is_trading_date(self, date):
+        return self._schedule is not None and date.strftime('%Y-%m-%d') in self._schedule["trading_dates"]
+
+    def _at_minute(self, now, minutes_ahead):
+        start = now.replace(second=0, microsecond=0) + timedelta(minutes=minutes_ahead)
+        return self.timezone.normalize(start) if hasattr(self.timezone, "normalize") else start
+
+    def next_open(self, now=None):
+        """
+        Start of the next open minute on a scheduled trading day (now, if open),
+        or None when none falls within the schedule's known dates.
+        """
+        now = now or datetime.now(self.timezone)
+        self._load_schedule()
+        if self._schedule is None:
+            return None
+        week = self._bitmap * 2  # wrap around Sunday -> Monday
+        offset = 0
+        while offset < MAX_LOOKAHEAD_DAYS * MINUTES_PER_DAY:
+            minute = self.minute_of_week(self._at_minute(now, offset))
+            found = week.find(OPEN, minute)
+            if found < 0:
+                return None
+            offset += found - minute
+            candidate = self._at_minute(now, offset)
+            if candidate.date() > self._schedule["end_date"]:
+                return None
+            if self._is_trading_date(candidate.date()):
+                return candidate if offset else now
+            # Not a trading date: continue from the next midnight
+            offset += MINUTES_PER_DAY - (candidate.hour * 60 + candidate.minute)
+        return None
+
+    def next_close(self, now=None):
+        """Start of the first closed minute from now (now itself if closed)."""
+        now = now or datetime.now(self.timezone)
+        if not self.is_open(now):
+            return now
+        minute = self.minute_of_week(now)
+        week = self._bitmap * 2
+        closed_at = week.find(CLOSED, minute)
+        # A trading date ends at midnight even if the next day's first range starts at 00:00
+        midnight = MINUTES_PER_DAY - (now.hour * 60 + now.minute)
+        next_date = self._at_minute(now, midnight).date()
+        if closed_at - minute > midnight and not self._is_trading_date(next_date):
+            return self._at_minute(now, midnight)
+        return self._at_minute(now, closed_at - minute)
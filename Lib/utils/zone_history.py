@@ -0,0 +1,145 @@
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_DIR = os.path.join(ROOT, "Lib", "assets", "zone_history")
+MAGIC = b"ZNH1"
+HEADER = struct.Struct("<4sI")   # magic, zones per record
+FIELDS = (("overshoot", "Overshoot"), ("undershoot", "Undershoot"), ("upper", "Upper Limit"), ("lower", "Lower Limit"))
+
+
+def record_dtype(zone_count):
+    return np.dtype([("effective_from", "<i8")] + [(name, "<f8", (zone_count,)) for name, _ in FIELDS])
+
+
+class ZoneHistory:
+    """
+    Append-only history of the published shoot grids, one file per symbol.
+
+    Each record is the grid's effective-from time (MT5 server epoch seconds,
+    the clock bar and tick times are in) followed by the overshoot,
+    undershoot, upper and lower arrays of every zone, stored as fixed-size
+    little-endian rows after a short header, so a file is read back with one
+    np.fromfile. Records are only appended when the grid actually
+    changes; a torn trailing record from an interrupted write is ignored.
+
+    at() returns the grid that was live at a timestamp (binary search on
+    effective_from), and asof() joins the history onto a whole array of bar
+    times at once, which lets replays and backtests apply the exact zone gate
+    check_tradable_zone saw without rebuilding grids bar by bar.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._cache = {}   # symbol -> (file size, records)
+
+    def path(self, symbol):
+        return os.path.join(self.directory, f"{symbol}.bin")
+
+    # Writing -------------------------------------------------------------
+
+    def append(self, symbol, zones, effective_from=None):
+        """
+        Record symbol's grid (shoot_values.pkl layout: {"zone1": {...}, ...})
+        as live from effective_from, in server epoch seconds (pass the tick's
+        time; the local-clock default is off by the broker's UTC offset and
+        would leak the grid onto earlier bars). Returns False when it equals
+        the latest record.
+        """
+        labels = sorted(zones, key=lambda label: int(label[4:]))
+        record = np.zeros(1, dtype=record_dtype(len(labels)))
+        record["effective_from"] = int(effective_from if effective_from is not None else time.time())
+        for name, key in FIELDS:
+            record[name][0] = [zones[label][key] for label in labels]
+        with self._lock:
+            history = self._load(symbol)
+            if history is not None and len(history):
+                if history.dtype != record.dtype:
+                    raise ValueError(f"{self.path(symbol)} holds {history.dtype[1].shape[0]} zones, not {len(labels)}")
+                last = history[-1]
+                if all(np.array_equal(last[name], record[name][0]) for name, _ in FIELDS):
+                    return False
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path(symbol)
+            new_file = not os.path.exists(path) or os.path.getsize(path) < HEADER.size
+            with open(path, 'wb' if new_file else 'ab') as f:
+                if new_file:
+                    f.write(HEADER.pack(MAGIC, len(labels)))
+                else:
+                    # Drop a torn trailing record so the new one starts on a row boundary
+                    f.truncate(HEADER.size + len(history) * record.dtype.itemsize)
+                f.write(record.tobytes())
+            self._cache.pop(symbol, None)
+        return True
+
+    # Reading -------------------------------------------------------------
+
+    def _load(self, symbol):
+        path = self.path(symbol)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        cached = self._cache.get(symbol)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        with open(path, 'rb') as f:
+            magic, zone_count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a zone history file")
+            dtype = record_dtype(zone_count)
+            rows = (size - HEADER.size) // dtype.itemsize
+            records = np.fromfile(f, dtype=dtype, count=rows)
+        self._cache[symbol] = (size, records)
+        return records
+
+    def records(self, symbol):
+        """All records for symbol as a structured array (empty when there is no history)."""
+        with self._lock:
+            history = self._load(symbol)
+        return history if history is not None else np.zeros(0, dtype=record_dtype(0))
+
+    def at(self, symbol, timestamp):
+        """The grid live at timestamp in the shoot_values.pkl layout, or None before the first record."""
+        history = self.records(symbol)
+        index = np.searchsorted(history["effective_from"], int(timestamp), side='right') - 1
+        if index < 0:
+            return None
+        record = history[index]
+        return {
+            f"zone{i + 1}": {key: float(record[name][i]) for name, key in FIELDS}
+            for i in range(record["overshoot"].shape[0])
+        }
+
+    def asof(self, symbol, times):
+        """
+        As-of join onto an array of bar times (server epoch seconds). Returns the
+        record index per bar (-1 before the first grid) and (bars x zones)
+        overshoot/undershoot/upper/lower arrays, NaN where no grid was live.
+        """
+        history = self.records(symbol)
+        times = np.asarray(times, dtype=np.int64)
+        index = np.searchsorted(history["effective_from"], times, side='right') - 1
+        valid = index >= 0
+        joined = {"index": index}
+        for name, _ in FIELDS:
+            values = np.full((len(times), history[name].shape[1] if len(history) else 0), np.nan)
+            values[valid] = history[name][index[valid]]
+            joined[name] = values
+        return joined
+
+    def untradable(self, symbol, times, prices):
+        """
+        check_tradable_zone over many bars: True where the price sits inside
+        any zone's [Lower Limit, Upper Limit] of the grid live at that bar.
+        Also returns the mask of bars that had a grid at all.
+        """
+        joined = self.asof(symbol, times)
+        prices = np.asarray(prices, dtype=float)[:, None]
+        inside = (joined["lower"] <= prices) & (prices <= joined["upper"])
+        return inside.any(axis=1), joined["index"] >= 0